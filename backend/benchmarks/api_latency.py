@@ -0,0 +1,147 @@
+# benchmarks/api_latency.py
+"""API latency while idle and during a full sync, against local CardDAV and MV stand-ins.
+
+Run from the backend directory:
+
+    python -m benchmarks.api_latency --members 5000 --topology split single
+
+`split` serves the API with gunicorn and runs syncs in worker.py, the production setup.
+`single` runs the development server with the sync worker inside the API process.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+from benchmarks.fake_carddav import FakeCardDAVServer
+from benchmarks.fake_mv import FakeMVServer
+from benchmarks.run_benchmarks import BACKEND_DIR, write_config
+
+# GET endpoints measured, served by the API alone or relayed to the sync worker
+ENDPOINTS = ["/config", "/history?per_page=5", "/status"]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def request(url: str, method: str = "GET") -> Dict:
+    with urllib.request.urlopen(urllib.request.Request(url, method=method), timeout=60) as response:
+        return json.loads(response.read())
+
+def start_api(topology: str, port: int, env: Dict[str, str]) -> List[subprocess.Popen]:
+    kwargs = {"cwd": BACKEND_DIR, "env": env, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if topology == "single":
+        return [subprocess.Popen([sys.executable, "main.py"], **dict(kwargs, env=dict(env, PORT=str(port))))]
+    worker = subprocess.Popen([sys.executable, "worker.py"], **kwargs)
+    api = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "main:app"],
+                           **dict(kwargs, env=dict(env, API_BIND=f"127.0.0.1:{port}")))
+    return [worker, api]
+
+def wait_until_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            request(f"{base_url}/status")
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+def measure(base_url: str, keep_going) -> Dict[str, List[float]]:
+    """Request every endpoint in turn while keep_going() is true. Returns latencies in milliseconds."""
+    latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+    while keep_going():
+        for endpoint in ENDPOINTS:
+            start_time = time.perf_counter()
+            request(f"{base_url}{endpoint}")
+            latencies[endpoint].append((time.perf_counter() - start_time) * 1000)
+    return latencies
+
+def summarize(latencies: Dict[str, List[float]]) -> Dict[str, Dict]:
+    summary = {}
+    for endpoint, values in latencies.items():
+        values = sorted(values)
+        summary[endpoint] = {
+            "requests": len(values),
+            "p50_ms": round(statistics.median(values), 2) if values else None,
+            "p95_ms": round(values[max(0, int(len(values) * 0.95) - 1)], 2) if values else None,
+            "max_ms": round(values[-1], 2) if values else None
+        }
+    return summary
+
+def run_topology(topology: str, members: int, idle_seconds: float, overrides: Dict) -> Dict:
+    with tempfile.TemporaryDirectory() as workdir, FakeCardDAVServer() as carddav, FakeMVServer(members) as mv:
+        overrides = dict({
+            "SYNC_WORKER_SOCKET": os.path.join(workdir, "sync_worker.sock"),
+            "SYNC_STATUS_FILE": os.path.join(workdir, "sync_state.json"),
+            "HISTORY_FILE": os.path.join(workdir, "sync_history.db"),
+        }, **overrides)
+        env = dict(os.environ, CONFIG_FILE=write_config(workdir, carddav.url, mv.url, overrides), LOG_DIR=workdir)
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        processes = start_api(topology, port, env)
+        try:
+            wait_until_ready(base_url)
+            idle_until = time.monotonic() + idle_seconds
+            idle = measure(base_url, lambda: time.monotonic() < idle_until)
+
+            request(f"{base_url}/sync", method="POST")
+            sync_started = time.perf_counter()
+
+            def sync_running() -> bool:
+                jobs = request(f"{base_url}/jobs")
+                return bool(jobs["running"] or jobs["queued"])
+
+            loaded = measure(base_url, sync_running)
+            sync_seconds = time.perf_counter() - sync_started
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=30)
+
+    result = {"topology": topology, "sync_seconds": round(sync_seconds, 3),
+              "idle": summarize(idle), "during_sync": summarize(loaded)}
+    for endpoint in ENDPOINTS:
+        idle_p95, loaded_p95 = result["idle"][endpoint]["p95_ms"], result["during_sync"][endpoint]["p95_ms"]
+        print(f"{topology:<6}  {endpoint:<22}  idle p95 {idle_p95:8.2f} ms  during sync p95 {loaded_p95:8.2f} ms")
+    return result
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=5000, help="MV members synced during the measurement")
+    parser.add_argument("--topology", nargs="+", choices=["split", "single"], default=["split", "single"])
+    parser.add_argument("--idle-seconds", type=float, default=5, help="how long to measure before the sync starts")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=JSON",
+                        help="override a config option, e.g. --set CARDDAV_CONCURRENCY=8")
+    parser.add_argument("--output", default="api_latency_results.json", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key] = json.loads(value)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "members": args.members,
+        "overrides": overrides,
+        "topologies": [run_topology(topology, args.members, args.idle_seconds, overrides) for topology in args.topology]
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
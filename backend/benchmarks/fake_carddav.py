@@ -0,0 +1,180 @@
+# benchmarks/fake_carddav.py
+import posixpath
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+COLLECTION_PATH = '/dav/addressbook/'
+NS = {'d': 'DAV:', 'c': 'urn:ietf:params:xml:ns:carddav'}
+
+class AddressBook:
+    """In-memory address book with ETags and an RFC 6578 change log."""
+
+    def __init__(self):
+        self.cards: Dict[str, Tuple[str, str]] = {}
+        self.version = 0
+        self.changes: List[Tuple[int, str]] = []
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+
+    def put(self, href: str, vcard: str) -> str:
+        etag = uuid.uuid4().hex
+        self.version += 1
+        self.cards[href] = (etag, vcard)
+        self.changes.append((self.version, href))
+        return etag
+
+    def delete(self, href: str):
+        self.version += 1
+        del self.cards[href]
+        self.changes.append((self.version, href))
+
+    @property
+    def sync_token(self) -> str:
+        return f"http://fake-carddav/sync/{self.version}"
+
+    def changed_since(self, token: str) -> Optional[List[str]]:
+        prefix = "http://fake-carddav/sync/"
+        if not token.startswith(prefix) or not token[len(prefix):].isdigit():
+            return None
+        since = int(token[len(prefix):])
+        if since > self.version:
+            return None
+        return list(dict.fromkeys(href for version, href in self.changes if version > since))
+
+class CardDAVHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    book: AddressBook = None
+    latency: float = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _path(self) -> str:
+        return posixpath.normpath(self.path.split('?', 1)[0].replace('//', '/'))
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status: int, body: bytes = b'', headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _multistatus(self, responses: List[str], sync_token: Optional[str] = None):
+        token = f"<d:sync-token>{escape(sync_token)}</d:sync-token>" if sync_token else ""
+        body = (f'<?xml version="1.0" encoding="utf-8"?>'
+                f'<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:carddav">'
+                f'{"".join(responses)}{token}</d:multistatus>').encode('utf-8')
+        self._send(207, body, {'Content-Type': 'application/xml; charset=utf-8'})
+
+    def _card_response(self, href: str, with_data: bool) -> str:
+        if href not in self.book.cards:
+            return f"<d:response><d:href>{escape(href)}</d:href><d:status>HTTP/1.1 404 Not Found</d:status></d:response>"
+        etag, vcard = self.book.cards[href]
+        data = f"<c:address-data>{escape(vcard)}</c:address-data>" if with_data else ""
+        return (f"<d:response><d:href>{escape(href)}</d:href><d:propstat><d:prop>"
+                f"<d:getetag>\"{etag}\"</d:getetag>{data}<d:resourcetype/></d:prop>"
+                f"<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>")
+
+    def _count(self):
+        with self.book.lock:
+            self.book.requests[self.command] = self.book.requests.get(self.command, 0) + 1
+
+    def _delay(self):
+        self._count()
+        if self.latency:
+            time.sleep(self.latency)
+
+    def do_REPORT(self):
+        self._delay()
+        root = ET.fromstring(self._body())
+        with self.book.lock:
+            if root.tag == '{urn:ietf:params:xml:ns:carddav}addressbook-query':
+                responses = [self._card_response(href, True) for href in self.book.cards]
+                return self._multistatus(responses)
+            if root.tag == '{urn:ietf:params:xml:ns:carddav}addressbook-multiget':
+                hrefs = [posixpath.normpath(elem.text) for elem in root.findall('d:href', NS)]
+                return self._multistatus([self._card_response(href, True) for href in hrefs])
+            if root.tag == '{DAV:}sync-collection':
+                changed = self.book.changed_since(root.find('d:sync-token', NS).text or '')
+                if changed is None:
+                    body = b'<?xml version="1.0"?><d:error xmlns:d="DAV:"><d:valid-sync-token/></d:error>'
+                    return self._send(403, body, {'Content-Type': 'application/xml'})
+                return self._multistatus([self._card_response(href, False) for href in changed], self.book.sync_token)
+        self._send(400)
+
+    def do_PROPFIND(self):
+        self._delay()
+        self._body()
+        with self.book.lock:
+            if self.headers.get('Depth', '0') == '0':
+                response = (f"<d:response><d:href>{COLLECTION_PATH}</d:href><d:propstat><d:prop>"
+                            f"<d:sync-token>{escape(self.book.sync_token)}</d:sync-token></d:prop>"
+                            f"<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>")
+                return self._multistatus([response])
+            collection = (f"<d:response><d:href>{COLLECTION_PATH}</d:href><d:propstat><d:prop>"
+                          f"<d:resourcetype><d:collection/></d:resourcetype></d:prop>"
+                          f"<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>")
+            responses = [collection] + [self._card_response(href, False) for href in self.book.cards]
+            return self._multistatus(responses)
+
+    def _precondition_failed(self, href: str) -> bool:
+        if_match = self.headers.get('If-Match')
+        if if_match is None:
+            return False
+        current = self.book.cards.get(href)
+        return current is None or current[0] != if_match.strip('"')
+
+    def do_PUT(self):
+        self._delay()
+        href = self._path()
+        vcard = self._body().decode('utf-8')
+        with self.book.lock:
+            if self._precondition_failed(href):
+                return self._send(412)
+            existed = href in self.book.cards
+            etag = self.book.put(href, vcard)
+        self._send(204 if existed else 201, headers={'ETag': f'"{etag}"'})
+
+    def do_DELETE(self):
+        self._delay()
+        href = self._path()
+        with self.book.lock:
+            if href not in self.book.cards:
+                return self._send(404)
+            if self._precondition_failed(href):
+                return self._send(412)
+            self.book.delete(href)
+        self._send(204)
+
+class FakeCardDAVServer:
+    """CardDAV server running on a background thread, for benchmarks."""
+
+    def __init__(self, latency: float = 0.0):
+        self.book = AddressBook()
+        handler = type('Handler', (CardDAVHandler,), {'book': self.book, 'latency': latency})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}{COLLECTION_PATH}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,80 @@
+# benchmarks/fake_mv.py
+import io
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+
+GROUPS = ['Sippe Adler', 'Sippe Falken', 'Runde Wölfe', 'Meute Füchse', 'Runde Bären']
+
+def generate_export(members: int, seed: int = 0) -> bytes:
+    """Build an XLSX member export shaped like the one the MV system returns."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(members):
+        firstname, lastname = f"Vorname{i}", f"Nachname{i}"
+        has_parent = rng.random() < 0.6
+        rows.append({
+            'Status': 'Aktiv',
+            'Vorname': firstname,
+            'Nachname': lastname,
+            'eMail': f"member{i}@example.org" if rng.random() < 0.9 else None,
+            'eMail2': f"member{i}.alt@example.org" if rng.random() < 0.3 else None,
+            'eMail_Eltern': f"parents{i}@example.org" if has_parent else None,
+            'Kleingruppe': rng.choice(GROUPS),
+        })
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
+
+class MVHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    export: bytes = b''
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'text/plain'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path.endswith('/auth/manual/sessionStartup'):
+            self.send_response(200)
+            self.send_header('Set-Cookie', 'JSESSIONID=benchmark; Path=/')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send(404)
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0].endswith('/search-multi/export-result-list'):
+            return self._send(200, self.export,
+                              'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self._send(404)
+
+class FakeMVServer:
+    """MV login and export endpoints serving a generated member list."""
+
+    def __init__(self, members: int):
+        handler = type('Handler', (MVHandler,), {'export': generate_export(members)})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,97 @@
+# benchmarks/mv_conversion.py
+"""MV export conversion: the former iterrows loop against the column-based conversion.
+
+Run from the backend directory:
+
+    python -m benchmarks.mv_conversion --members 50000 --repeat 5
+"""
+import argparse
+import json
+import platform
+import time
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from benchmarks.fake_mv import generate_export
+from models import UserDto
+from mv_integration import convert_dataframe_to_userdto, read_excel_openpyxl
+
+def convert_with_iterrows(df: pd.DataFrame) -> List[UserDto]:
+    """The row-by-row conversion that convert_dataframe_to_userdto replaced, kept as the baseline."""
+    users = []
+    for _, row in df.iterrows():
+        status = row['Status']
+        if status.lower() != "aktiv":
+            continue
+        firstname = row['Vorname']
+        lastname = row['Nachname']
+        own_email = row['eMail']
+        secondary_email = row['eMail2']
+        parent_email = row['eMail_Eltern']
+
+        if pd.isna(own_email) and pd.isna(secondary_email) and pd.isna(parent_email):
+            continue
+
+        groups = []
+        if pd.notna(row['Kleingruppe']):
+            groups.append(row['Kleingruppe'])
+
+        users.append(UserDto(
+            firstname=firstname,
+            lastname=lastname,
+            own_email=own_email,
+            secondary_email=secondary_email,
+            parent_email=parent_email,
+            groups=groups
+        ))
+    return users
+
+def user_fields(users: List[UserDto]) -> List[tuple]:
+    return [tuple(getattr(user, field) for field in UserDto.__slots__) for user in users]
+
+def best_of(convert: Callable[[pd.DataFrame], List[UserDto]], df: pd.DataFrame, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        convert(df)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=50000, help="rows in the synthetic export")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per implementation, the fastest one counts")
+    parser.add_argument("--output", default="mv_conversion_results.json", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    df = read_excel_openpyxl(generate_export(args.members))
+    # Mark every fourth member passive, so the status filter drops rows as in a real export
+    df.loc[df.index % 4 == 3, 'Status'] = 'Passiv'
+
+    baseline, vectorized = convert_with_iterrows(df), convert_dataframe_to_userdto(df)
+    if user_fields(baseline) != user_fields(vectorized):
+        raise SystemExit("The conversions disagree, the numbers would not be comparable")
+
+    results: Dict = {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "members": args.members,
+        "users": len(vectorized),
+        "seconds": {
+            "iterrows": round(best_of(convert_with_iterrows, df, args.repeat), 4),
+            "vectorized": round(best_of(convert_dataframe_to_userdto, df, args.repeat), 4)
+        }
+    }
+    seconds = results["seconds"]
+    results["speedup"] = round(seconds["iterrows"] / seconds["vectorized"], 1)
+    print(f"{args.members} rows, {len(vectorized)} users  iterrows {seconds['iterrows']:.3f}s  "
+          f"vectorized {seconds['vectorized']:.3f}s  speedup {results['speedup']}x")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/run_benchmarks.py
+"""Offline end-to-end benchmark of the sync against local CardDAV and MV stand-ins.
+
+Run from the backend directory:
+
+    python -m benchmarks.run_benchmarks --sizes 100 1000 --latency 0.005
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.fake_carddav import FakeCardDAVServer
+from benchmarks.fake_mv import FakeMVServer
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def unload_backend_modules():
+    """Forget every imported backend module, so the next import reads the new configuration."""
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.dirname(os.path.abspath(path)) == BACKEND_DIR:
+            del sys.modules[name]
+
+def write_config(workdir: str, carddav_url: str, mv_url: str, overrides: Dict) -> str:
+    config = {
+        "CARDDAV_URL": carddav_url,
+        "CARDDAV_USERNAME": "benchmark",
+        "CARDDAV_PASSWORD": "benchmark",
+        "CARDDAV_FETCH_MODE": "incremental",
+        "CARDDAV_CONCURRENCY": 4,
+        "GROUP_MAPPING": {"Sippe Adler": "Sippen", "Sippe Falken": "Sippen", "Runde Wölfe": "Runden",
+                          "Runde Bären": "Runden", "Meute Füchse": "Meuten"},
+        "DEFAULT_GROUP": "gesammter Stamm",
+        "APPLY_GROUP_MAPPING_TO_PARENTS": False,
+        "APPLY_DEFAULT_GROUP_TO_PARENTS": True,
+        "RUN_SCHEDULE": "single",
+        "NOTIFICATION_EMAIL": "",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": 1,
+        "SMTP_USERNAME": "",
+        "SMTP_PASSWORD": "",
+        "STATE_FILE": os.path.join(workdir, "dangling_contacts_state.json"),
+        "CONTACT_CACHE_FILE": os.path.join(workdir, "contacts_cache.db"),
+        "MV_BASE_URL": mv_url,
+        "MV_SESSION_FILE": os.path.join(workdir, "mv_session.json"),
+        "MV_SNAPSHOT_FILE": os.path.join(workdir, "mv_export_snapshot.json"),
+        "MV_USERNAME": "benchmark",
+        "MV_PASSWORD": "benchmark",
+        "LOG_LEVEL": "WARNING",
+        "DRY_RUN": False
+    }
+    config.update(overrides)
+    path = os.path.join(workdir, "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f, indent=4)
+    return path
+
+def run_size(members: int, latency: float, overrides: Dict) -> Dict:
+    with tempfile.TemporaryDirectory() as workdir, \
+            FakeCardDAVServer(latency) as carddav, FakeMVServer(members) as mv:
+        os.environ["CONFIG_FILE"] = write_config(workdir, carddav.url, mv.url, overrides)
+        os.environ["LOG_DIR"] = workdir
+
+        unload_backend_modules()
+        import carddav_sync
+
+        runs = []
+        for label in ("cold", "warm"):
+            carddav.book.requests.clear()
+            start_time = time.perf_counter()
+            stats = carddav_sync.sync_contacts()
+            elapsed = time.perf_counter() - start_time
+            breakdown = stats.pop("breakdown")
+            runs.append({
+                "run": label,
+                "seconds": round(elapsed, 3),
+                "stats": stats,
+                "phases": breakdown["phases"],
+                "server_requests": dict(carddav.book.requests)
+            })
+            print(f"{members:>6} members  {label:<4}  {elapsed:8.2f}s  "
+                  f"created={stats['created']} updated={stats['updated']} unchanged={stats['unchanged']} "
+                  f"failed={stats['failed']}")
+        return {"members": members, "cards": len(carddav.book.cards), "runs": runs}
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="member counts to benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay added to every CardDAV request")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=JSON",
+                        help="override a config option, e.g. --set CARDDAV_CONCURRENCY=8")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key] = json.loads(value)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency": args.latency,
+        "overrides": overrides,
+        "sizes": [run_size(members, args.latency, overrides) for members in args.sizes]
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
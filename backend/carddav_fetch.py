@@ -0,0 +1,283 @@
+# carddav_fetch.py
+import time
+import requests
+import urllib3
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+from requests.auth import HTTPBasicAuth
+from config import CONFIG, logger
+from contact_cache import ContactCache
+
+NS = {'d': 'DAV:', 'c': 'urn:ietf:params:xml:ns:carddav'}
+
+class InvalidSyncToken(Exception):
+    """Raised when the server no longer accepts the stored sync-token."""
+
+def carddav_auth() -> HTTPBasicAuth:
+    return HTTPBasicAuth(CONFIG['CARDDAV_USERNAME'], CONFIG['CARDDAV_PASSWORD'])
+
+def href_to_url(href: str) -> str:
+    """Turn a server-relative href into an absolute URL."""
+    parsed_uri = urlparse(CONFIG['CARDDAV_URL'])
+    return f"{parsed_uri.scheme}://{parsed_uri.netloc}{href}"
+
+# WebDAV Requests
+
+def report(session: requests.Session, body: str, depth: str = '1') -> requests.Response:
+    """Send a REPORT request to the address book collection, leaving the body unread."""
+    headers = {
+        'Depth': depth,
+        'Content-Type': 'application/xml; charset=utf-8'
+    }
+    response = session.request('REPORT', CONFIG['CARDDAV_URL'], headers=headers, data=body,
+                               auth=carddav_auth(), stream=True)
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        response.close()
+        raise
+    return response
+
+def iter_multistatus(response: requests.Response, tags=('{DAV:}response',)) -> Iterator[ET.Element]:
+    """Stream a multistatus body, yielding each element in tags as soon as it closes.
+
+    Yielded elements are cleared afterwards, so memory stays flat regardless of body size.
+    """
+    response.raw.decode_content = True
+    root = None
+    try:
+        for event, elem in ET.iterparse(response.raw, events=('start', 'end')):
+            if root is None:
+                root = elem
+            elif event == 'end' and elem.tag in tags:
+                yield elem
+                root.clear()
+    finally:
+        response.close()
+
+def iter_address_data(response: requests.Response) -> Iterator[Tuple[str, str, str]]:
+    """Yield (href, etag, vcard_data) for every card in a multistatus body."""
+    for response_elem in iter_multistatus(response):
+        href = response_elem.find('d:href', NS).text
+        etag_elem = response_elem.find('.//d:getetag', NS)
+        data_elem = response_elem.find('.//c:address-data', NS)
+        if etag_elem is None or data_elem is None or not data_elem.text:
+            continue
+        yield href, etag_elem.text.strip('"'), data_elem.text
+
+def fetch_all_contacts(session: requests.Session) -> Iterator[Tuple[str, str, str]]:
+    """Fetch every card with a single addressbook-query REPORT."""
+    body = """
+    <c:addressbook-query xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:carddav">
+        <d:prop>
+            <d:getetag />
+            <c:address-data />
+        </d:prop>
+    </c:addressbook-query>
+    """
+    return iter_address_data(report(session, body))
+
+def fetch_sync_token(session: requests.Session) -> Optional[str]:
+    """Read the current sync-token of the address book collection."""
+    headers = {
+        'Depth': '0',
+        'Content-Type': 'application/xml; charset=utf-8'
+    }
+    body = """
+    <d:propfind xmlns:d="DAV:">
+        <d:prop>
+            <d:sync-token />
+        </d:prop>
+    </d:propfind>
+    """
+    response = session.request('PROPFIND', CONFIG['CARDDAV_URL'], headers=headers, data=body, auth=carddav_auth())
+    response.raise_for_status()
+    token_elem = ET.fromstring(response.content).find('.//d:sync-token', NS)
+    return token_elem.text if token_elem is not None and token_elem.text else None
+
+def fetch_multiget(session: requests.Session, hrefs: List[str]) -> List[Tuple[str, str, str]]:
+    """Fetch the given cards with an addressbook-multiget REPORT."""
+    if not hrefs:
+        return []
+    href_elems = "\n".join(f"<d:href>{_escape(href)}</d:href>" for href in hrefs)
+    body = f"""
+    <c:addressbook-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:carddav">
+        <d:prop>
+            <d:getetag />
+            <c:address-data />
+        </d:prop>
+        {href_elems}
+    </c:addressbook-multiget>
+    """
+    # Batches are small and retried as a whole, so each one is read completely here
+    return list(iter_address_data(report(session, body)))
+
+def fetch_multiget_batched(session: requests.Session, hrefs: List[str]) -> Iterator[Tuple[str, str, str]]:
+    """Fetch cards in addressbook-multiget batches, retrying each batch whose body could not be read.
+
+    Connection errors, 429 and 5xx answers are already retried by the session. Only failures while
+    streaming the body (dropped connection, read timeout, truncated XML) are retried here.
+    """
+    batch_size = max(1, int(CONFIG.get("CARDDAV_MULTIGET_BATCH_SIZE", 100)))
+    retries = max(0, int(CONFIG.get("CARDDAV_MULTIGET_RETRIES", 3)))
+    for start in range(0, len(hrefs), batch_size):
+        batch = hrefs[start:start + batch_size]
+        for attempt in range(retries + 1):
+            try:
+                contacts = fetch_multiget(session, batch)
+                break
+            except (urllib3.exceptions.HTTPError, ET.ParseError) as e:
+                if attempt == retries:
+                    logger.error(f"Multiget batch starting at {start} failed after {attempt + 1} attempts: {str(e)}")
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"Multiget batch starting at {start} could not be read ({str(e)}), retrying in {delay}s")
+                time.sleep(delay)
+        yield from contacts
+
+def fetch_etags(session: requests.Session) -> Dict[str, str]:
+    """List the href and ETag of every card without downloading card bodies."""
+    headers = {
+        'Depth': '1',
+        'Content-Type': 'application/xml; charset=utf-8'
+    }
+    body = """
+    <d:propfind xmlns:d="DAV:">
+        <d:prop>
+            <d:getetag />
+            <d:resourcetype />
+        </d:prop>
+    </d:propfind>
+    """
+    response = session.request('PROPFIND', CONFIG['CARDDAV_URL'], headers=headers, data=body,
+                               auth=carddav_auth(), stream=True)
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        response.close()
+        raise
+
+    etags = {}
+    for response_elem in iter_multistatus(response):
+        if response_elem.find('.//d:resourcetype/d:collection', NS) is not None:
+            continue
+        etag_elem = response_elem.find('.//d:getetag', NS)
+        if etag_elem is None or not etag_elem.text:
+            continue
+        etags[response_elem.find('d:href', NS).text] = etag_elem.text.strip('"')
+    return etags
+
+def fetch_changes(session: requests.Session, sync_token: str) -> Tuple[str, Dict[str, Optional[str]], List[str]]:
+    """Ask the server for changes since sync_token (RFC 6578).
+
+    Returns the new sync-token, the changed hrefs with their ETag if reported, and the deleted hrefs.
+    """
+    body = f"""
+    <d:sync-collection xmlns:d="DAV:">
+        <d:sync-token>{_escape(sync_token)}</d:sync-token>
+        <d:sync-level>1</d:sync-level>
+        <d:prop>
+            <d:getetag />
+        </d:prop>
+    </d:sync-collection>
+    """
+    try:
+        response = report(session, body)
+    except requests.HTTPError as e:
+        # 403/409 carry the valid-sync-token precondition, 507 signals a truncated result
+        if e.response is not None and e.response.status_code in (400, 403, 409, 410, 507):
+            raise InvalidSyncToken(str(e))
+        raise
+
+    changed: Dict[str, Optional[str]] = {}
+    deleted = []
+    new_token = None
+    collection_path = urlparse(CONFIG['CARDDAV_URL']).path.rstrip('/')
+    for elem in iter_multistatus(response, tags=('{DAV:}response', '{DAV:}sync-token')):
+        if elem.tag == '{DAV:}sync-token':
+            new_token = elem.text
+            continue
+        href = elem.find('d:href', NS).text
+        if href.rstrip('/') == collection_path:
+            continue
+        status_elem = elem.find('d:status', NS)
+        if status_elem is not None and ' 404 ' in f"{status_elem.text} ":
+            deleted.append(href)
+        else:
+            etag_elem = elem.find('.//d:getetag', NS)
+            changed[href] = etag_elem.text.strip('"') if etag_elem is not None and etag_elem.text else None
+
+    if not new_token:
+        raise InvalidSyncToken("Server did not return a new sync-token")
+    return new_token, changed, deleted
+
+def _escape(value: str) -> str:
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+# Fetch Strategies
+
+def fetch_full(session: requests.Session, cache: ContactCache):
+    """Stream the whole address book into the cache, evicting cards that disappeared."""
+    try:
+        # Read the token first so changes made during the query show up on the next run
+        sync_token = fetch_sync_token(session)
+    except (requests.RequestException, ET.ParseError) as e:
+        logger.warning(f"Could not read sync-token, incremental fetch disabled for next run: {str(e)}")
+        sync_token = None
+
+    known_etags = cache.etags()
+    seen, changed = set(), 0
+    with cache.batch():
+        for href, etag, vcard_data in fetch_all_contacts(session):
+            seen.add(href)
+            if known_etags.get(href) != etag:
+                cache.store(href, etag, vcard_data)
+                changed += 1
+        removed = known_etags.keys() - seen
+        cache.evict(removed)
+        cache.set_sync_token(sync_token)
+    logger.info(f"Full fetch: {len(seen)} cards, {changed} changed, {len(removed)} removed")
+
+def fetch_incremental(session: requests.Session, cache: ContactCache):
+    """Apply server-side changes since the last run to the cache."""
+    sync_token = cache.get_sync_token()
+    if not sync_token:
+        logger.info("No sync-token stored, performing full fetch")
+        return fetch_full(session, cache)
+
+    try:
+        new_token, changed, deleted = fetch_changes(session, sync_token)
+    except InvalidSyncToken as e:
+        logger.warning(f"Stored sync-token rejected ({str(e)}), falling back to full fetch")
+        return fetch_full(session, cache)
+
+    # Cards the last sync wrote are reported as changed, but are cached with their current ETag already
+    known_etags = cache.etags()
+    stale = [href for href, etag in changed.items() if etag is None or known_etags.get(href) != etag]
+    with cache.batch():
+        cache.evict(deleted)
+        for href, etag, vcard_data in fetch_multiget_batched(session, stale):
+            cache.store(href, etag, vcard_data)
+        cache.set_sync_token(new_token)
+    logger.info(f"Incremental fetch: {len(changed)} changed, {len(stale)} downloaded, {len(deleted)} deleted")
+
+def fetch_by_etag(session: requests.Session, cache: ContactCache):
+    """Two-phase fetch: list ETags, then multiget only cards that differ from the cache."""
+    try:
+        sync_token = fetch_sync_token(session)
+    except (requests.RequestException, ET.ParseError) as e:
+        logger.warning(f"Could not read sync-token: {str(e)}")
+        sync_token = None
+
+    known_etags = cache.etags()
+    server_etags = fetch_etags(session)
+    stale = [href for href, etag in server_etags.items() if known_etags.get(href) != etag]
+    removed = known_etags.keys() - server_etags.keys()
+
+    with cache.batch():
+        cache.evict(removed)
+        for href, etag, vcard_data in fetch_multiget_batched(session, stale):
+            cache.store(href, etag, vcard_data)
+        cache.set_sync_token(sync_token)
+    logger.info(f"Multiget fetch: {len(stale)} of {len(server_etags)} cards downloaded, {len(removed)} removed")
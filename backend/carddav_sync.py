@@ -1,20 +1,37 @@
 import pandas as pd
 import requests
 import vobject
-from typing import List, Tuple, Dict
+from typing import Callable, List, Set, Tuple, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
 import os
 import json
-import xml.etree.ElementTree as ET
+import hashlib
+import threading
 import time
 import uuid
 from urllib.parse import urlparse
 from requests.auth import HTTPBasicAuth
-from config import CONFIG, logger
+from config import CONFIG, config_store, logger
+from contact_cache import ContactCache
+from carddav_fetch import fetch_by_etag, fetch_full, fetch_incremental, fetch_multiget, href_to_url
+from http_client import create_session, is_precondition_failed
+from vcard_writer import ManagedFields, render_new_card, update_card
 from mv_integration import fetch_users_from_mv
-from notifications import send_email
+from notifications import NotificationDigest
+from group_mapping import compile_group_resolver, resolve_groups
+from jobs import SyncCancelled, SyncJob
+import metrics
 from models import UserDto
 
+CONNECTOR_NOTE = "Updated automatically via Python MV Connector"
+# How often a write rejected with 412 Precondition Failed is refetched and retried
+CONFLICT_RETRIES = 2
+# Consecutive runs a managed card may be missing from MV before a reminder, and before it is deleted
+DANGLING_REMINDER_AFTER = 4
+DANGLING_DELETE_AFTER = 7
+
 # Utility Functions
 
 def log_execution_time(func):
@@ -48,228 +65,422 @@ def generate_uid():
 
 # CardDAV Connection and Fetching
 
+def get_concurrency() -> int:
+    """Number of CardDAV writes allowed in flight at the same time."""
+    return max(1, int(CONFIG.get("CARDDAV_CONCURRENCY", 1)))
+
 def connect_to_carddav():
     """Establish a connection to the CardDAV server."""
     logger.info("Connecting to CardDAV server")
-    return requests.Session()
+    # One keep-alive pool sized for the worker threads sharing this session
+    return create_session("carddav", pool_size=max(10, get_concurrency()))
+
+def map_concurrently(func: Callable, items: List) -> List[Tuple[object, Optional[Exception]]]:
+    """Run func over items on a bounded thread pool.
+
+    Returns (result, exception) pairs in the order of items, so callers stay deterministic.
+    """
+    concurrency = get_concurrency()
+    if concurrency == 1 or len(items) <= 1:
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append((func(item), None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+
+    # Pool threads read the same configuration version as the calling sync
+    snapshot = config_store.current()
+
+    def run_pinned(item):
+        with config_store.pinned(snapshot):
+            return func(item)
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_pinned, item) for item in items]
+        for future in futures:
+            try:
+                outcomes.append((future.result(), None))
+            except Exception as e:
+                outcomes.append((None, e))
+    return outcomes
 
 @log_execution_time
-def fetch_contacts(session: requests.Session) -> List[Tuple[str, str, str]]:
-    """Fetch all contacts from the CardDAV server."""
+def fetch_contacts(session: requests.Session, cache: ContactCache):
+    """Fetch contacts from the CardDAV server into the local cache."""
     logger.info("Fetching contacts from CardDAV server")
-    url = CONFIG['CARDDAV_URL']
-    headers = {
-        'Depth': '1',
-        'Content-Type': 'application/xml; charset=utf-8'
-    }
-    body = """
-    <c:addressbook-query xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:carddav">
-        <d:prop>
-            <d:getetag />
-            <c:address-data />
-        </d:prop>
-    </c:addressbook-query>
-    """
-    
     try:
-        response = session.request('REPORT', url, headers=headers, data=body, 
-                                   auth=HTTPBasicAuth(CONFIG['CARDDAV_USERNAME'], CONFIG['CARDDAV_PASSWORD']))
-        response.raise_for_status()
+        with metrics.timer("carddav_fetch"):
+            fetch_mode = CONFIG.get("CARDDAV_FETCH_MODE", "incremental")
+            if fetch_mode == "incremental":
+                fetch_incremental(session, cache)
+            elif fetch_mode == "multiget":
+                fetch_by_etag(session, cache)
+            else:
+                fetch_full(session, cache)
     except requests.RequestException as e:
         logger.error(f"Error fetching contacts from CardDAV server: {str(e)}")
         raise
 
-    contacts = []
-    root = ET.fromstring(response.content)
-    ns = {'d': 'DAV:', 'c': 'urn:ietf:params:xml:ns:carddav'}
-    for response_elem in root.findall('.//d:response', ns):
-        href = response_elem.find('d:href', ns).text
-        etag = response_elem.find('.//d:getetag', ns).text.strip('"')
-        vcard_data = response_elem.find('.//c:address-data', ns).text
-        contacts.append((href, etag, vcard_data))
+# vCard Operations
 
-    logger.info(f"Fetched {len(contacts)} contacts from CardDAV server")
-    return contacts
+class IndexedCard:
+    """A cached card. The vCard itself is only parsed when it is about to be changed."""
+
+    __slots__ = ('href', 'etag', 'uid', 'fn', 'emails', 'managed', 'state_hash', '_cache', '_vcard')
+
+    def __init__(self, cache: ContactCache, href: str, etag: str, uid: Optional[str], fn: Optional[str],
+                 emails: List[str], managed: bool, state_hash: Optional[str], vcard: Optional[vobject.vCard] = None):
+        self._cache = cache
+        self.href = href
+        self.etag = etag
+        self.uid = uid
+        self.fn = fn
+        self.emails = emails
+        self.managed = managed
+        self.state_hash = state_hash
+        self._vcard = vcard
+
+    @property
+    def text(self) -> str:
+        return self._cache.get_vcard(self.href)
+
+    @property
+    def vcard(self) -> vobject.vCard:
+        if self._vcard is None:
+            self._vcard = vobject.readOne(self._cache.get_vcard(self.href))
+        return self._vcard
+
+class ContactIndex:
+    """Address book index built once per sync, mapping FN, UID and email to cached cards."""
+
+    def __init__(self, cache: Optional[ContactCache] = None):
+        self.cache = cache
+        self.entries: List[IndexedCard] = []
+        self.by_fn: Dict[str, IndexedCard] = {}
+        self.by_uid: Dict[str, IndexedCard] = {}
+        self.by_email: Dict[str, IndexedCard] = {}
+        # Managed cards whose name is gone from MV, by email, so renamed members keep their card
+        self._orphans_by_email: Dict[str, IndexedCard] = {}
+        self.claimed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, entry: IndexedCard):
+        """Add a card to the index. The first card seen for a key wins."""
+        self.entries.append(entry)
+        if entry.fn:
+            self.by_fn.setdefault(entry.fn, entry)
+        if entry.uid:
+            self.by_uid.setdefault(entry.uid, entry)
+        for email in entry.emails:
+            self.by_email.setdefault(email, entry)
+
+    def find_by_fn(self, fullname: str) -> Optional[IndexedCard]:
+        return self.by_fn.get(fullname)
+
+    def find_by_uid(self, uid: str) -> Optional[IndexedCard]:
+        return self.by_uid.get(uid)
+
+    def find_by_email(self, email: str) -> Optional[IndexedCard]:
+        return self.by_email.get(email.strip().lower())
+
+    def collect_orphans(self, mv_names: Set[str]):
+        """Make managed cards whose name no longer appears in MV claimable by email."""
+        self._orphans_by_email = {}
+        for entry in self.entries:
+            if entry.managed and entry.fn and entry.fn not in mv_names:
+                for email in entry.emails:
+                    self._orphans_by_email.setdefault(email, entry)
+
+    def claim_orphan(self, email: Optional[str]) -> Optional[IndexedCard]:
+        """Hand out an orphaned card with email at most once, for a member that was renamed."""
+        if not email:
+            return None
+        with self._lock:
+            entry = self._orphans_by_email.get(email.strip().lower())
+            if entry is None:
+                return None
+            for orphan_email in entry.emails:
+                self._orphans_by_email.pop(orphan_email, None)
+            self.claimed.add(entry.href)
+            return entry
+
+    def __len__(self):
+        return len(self.entries)
+
+def describe_card(vcard: vobject.vCard) -> Tuple[Optional[str], Optional[str], List[str], bool, str]:
+    """Extract UID, FN, emails, connector flag and state hash from a parsed vCard."""
+    contents = vcard.contents
+    uid = vcard.uid.value if 'uid' in contents else None
+    fn = vcard.fn.value if 'fn' in contents else None
+    emails = [email.value.strip().lower() for email in contents.get('email', []) if email.value]
+    managed = 'note' in contents and vcard.note.value == CONNECTOR_NOTE
+    return uid, fn, emails, managed, card_state_hash(card_state(vcard))
 
-# vCard Operations
+@log_execution_time
+def build_contact_index(cache: ContactCache, read_only: bool = False) -> ContactIndex:
+    """Index the cached address book for O(1) lookups.
 
-def find_or_create_vcard(contacts: List[Tuple[str, str, str]], fullname: str) -> Tuple[vobject.vCard, str, str]:
-    """Find an existing vCard or create a new one."""
-    for href, etag, vcard_string in contacts:
-        vcard = vobject.readOne(vcard_string)
-        if vcard.fn.value == fullname:
-            logger.debug(f"Found existing vCard for {fullname}")
-            return vcard, href, etag
-    logger.debug(f"Creating new vCard for {fullname}")
-    return vobject.vCard(), None, None
+    Only cards downloaded since the last run are parsed; everything else comes from the cache.
+    With read_only, parsed fields are neither written back nor timed, so the index can be built
+    next to a running sync without taking its write lock or adding to its breakdown.
+    """
+    index = ContactIndex(cache)
+    parsed = 0
+    for row in cache.rows():
+        if row['parsed']:
+            emails = row['emails'].split("\n") if row['emails'] else []
+            index.add(IndexedCard(cache, row['href'], row['etag'], row['uid'], row['fn'], emails,
+                                  bool(row['managed']), row['state_hash']))
+            continue
+
+        try:
+            with nullcontext() if read_only else metrics.timer("vcard_parse"):
+                vcard = vobject.readOne(cache.get_vcard(row['href']))
+                uid, fn, emails, managed, state_hash = describe_card(vcard)
+        except Exception as e:
+            logger.error(f"Skipping unparseable vCard {row['href']}: {str(e)}")
+            if not read_only:
+                cache.store_metadata(row['href'], None, None, [], False, None)
+            continue
+        if not read_only:
+            cache.store_metadata(row['href'], uid, fn, emails, managed, state_hash)
+        index.add(IndexedCard(cache, row['href'], row['etag'], uid, fn, emails, managed, state_hash, vcard))
+        parsed += 1
+
+    if not read_only:
+        cache.commit()
+    logger.info(f"Indexed {len(index)} contacts, {parsed} parsed")
+    return index
+
+def refresh_card(session, entry: IndexedCard) -> bool:
+    """Download the current version of a card after a 412 and update its index entry in place.
+
+    Returns False if the card no longer exists on the server.
+    """
+    logger.info(f"Refetching contact card {entry.href}")
+    cache = entry._cache
+    cards = fetch_multiget(session, [entry.href])
+    if not cards:
+        cache.evict([entry.href])
+        cache.commit()
+        return False
+    _, etag, vcard_data = cards[0]
+    vcard = vobject.readOne(vcard_data)
+    uid, fn, emails, managed, state_hash = describe_card(vcard)
+    with cache.batch():
+        cache.store(entry.href, etag, vcard_data)
+        cache.store_metadata(entry.href, uid, fn, emails, managed, state_hash)
+    entry.etag, entry.uid, entry.fn, entry.emails = etag, uid, fn, emails
+    entry.managed, entry.state_hash, entry._vcard = managed, state_hash, vcard
+    return True
 
 def get_user_email(user: UserDto, is_parent: bool) -> str:
     """Get the appropriate email for a user or parent."""
     if is_parent:
-        if pd.isna(user.parent_email) or not user.parent_email.strip():
+        if not user.parent_email:
             raise ValueError(f"Valid parent email is required for creating Parent VCard of {user.fullname}")
-        return safe_string(user.parent_email)
+        return user.parent_email
     
-    if not pd.isna(user.own_email) and user.own_email.strip():
-        return safe_string(user.own_email)
-    elif not pd.isna(user.secondary_email) and user.secondary_email.strip():
-        logger.warning(f"Using secondary email for {user.fullname} as primary email is empty")
-        return safe_string(user.secondary_email)
-    else:
+    if not user.primary_email:
         raise ValueError(f"No valid email found for {user.fullname}")
+    if not user.own_email:
+        logger.warning(f"Using secondary email for {user.fullname} as primary email is empty")
+    return user.primary_email
 
-def update_vcard(vcard: vobject.vCard, user: UserDto, is_parent: bool):
-    """Update or create a vCard with user information."""
-    logger.debug(f"Updating vCard for {'parent of ' if is_parent else ''}{user.fullname}")
-    
-    if 'uid' not in vcard.contents:
-        vcard.add('uid').value = generate_uid()
-    
-    fn_value = f"{safe_string(user.fullname)}{' (Eltern)' if is_parent else ''}"
-    if 'fn' not in vcard.contents:
-        vcard.add('fn').value = fn_value
-    else:
-        vcard.fn.value = fn_value
-    
-    n_value = vobject.vcard.Name(family=safe_string(user.lastname), given=safe_string(user.firstname))
-    if 'n' not in vcard.contents:
-        vcard.add('n').value = n_value
-    else:
-        vcard.n.value = n_value
-
-    try:
-        email_value = get_user_email(user, is_parent)
-        if 'email' not in vcard.contents:
-            vcard.add('email').value = email_value
-        else:
-            vcard.email.value = email_value
-    except ValueError as e:
-        logger.error(str(e))
-        raise
-
-    update_group_membership(vcard, user.groups, is_parent)
-    add_connector_info(vcard)
+def managed_fields(user: UserDto, is_parent: bool) -> ManagedFields:
+    """The values of the properties the connector maintains on a user or parent card."""
+    fn = user.parent_fullname if is_parent else safe_string(user.fullname)
+    return ManagedFields(fn, safe_string(user.lastname), safe_string(user.firstname),
+                         get_user_email(user, is_parent), get_final_groups(user.groups, is_parent), CONNECTOR_NOTE)
 
-def update_group_membership(vcard: vobject.vCard, groups: List[str], is_parent: bool):
-    """Update the group membership of a vCard."""
-    mapped_groups = apply_group_mapping(groups, is_parent)
-    final_groups = add_default_group(mapped_groups, is_parent)
-    
-    if is_parent:
-        final_groups.append('Eltern')
-    
-    vcard.add('categories').value = final_groups
+def render_vcard(entry: Optional[IndexedCard], fields: ManagedFields) -> Tuple[str, str]:
+    """Serialize the card for entry with fields applied, or a new card if there is no entry.
 
-def apply_group_mapping(groups: List[str], is_parent: bool) -> List[str]:
-    """Apply group mapping based on configuration."""
-    mapped_groups = groups.copy()
-    
-    if not is_parent or CONFIG["APPLY_GROUP_MAPPING_TO_PARENTS"]:
-        for group in groups:
-            if group in CONFIG["GROUP_MAPPING"]:
-                mapped_group = CONFIG["GROUP_MAPPING"][group]
-                if mapped_group not in mapped_groups:
-                    mapped_groups.append(mapped_group)
-                    logger.info(f"Added mapped group: {mapped_group}")
-
-    return mapped_groups
-
-def add_default_group(groups: List[str], is_parent: bool) -> List[str]:
-    """Add the default group if configured."""
-    if not is_parent or CONFIG["APPLY_DEFAULT_GROUP_TO_PARENTS"]:
-        if CONFIG["DEFAULT_GROUP"] not in groups:
-            groups.append(CONFIG["DEFAULT_GROUP"])
-            logger.info(f"Added default group: {CONFIG['DEFAULT_GROUP']}")
-    return groups
-
-def add_connector_info(vcard: vobject.vCard):
-    """Add a note to indicate the vCard was updated by this connector."""
-    NOTE_TEXT = "Updated automatically via Python MV Connector"
-    vcard.add('note').value = NOTE_TEXT
+    Returns the vCard text and the card's UID.
+    """
+    if entry is None:
+        uid = generate_uid()
+        return render_new_card(uid, fields), uid
+    uid = entry.uid or generate_uid()
+    return update_card(entry.text, fields, uid), uid
+
+def get_final_groups(groups: List[str], is_parent: bool) -> List[str]:
+    """Resolve the categories a user or parent card should carry."""
+    return resolve_groups(groups, is_parent)
+
+# Change Detection
+
+def card_state(vcard: vobject.vCard) -> Tuple:
+    """Normalize the managed fields (FN, N, EMAIL, CATEGORIES, NOTE) of an existing vCard."""
+    contents = vcard.contents
+    fn = vcard.fn.value if 'fn' in contents else None
+    n = (_name_part(vcard.n.value.family), _name_part(vcard.n.value.given)) if 'n' in contents else None
+    email = vcard.email.value.strip() if 'email' in contents and vcard.email.value else None
+    categories = set()
+    for categories_prop in contents.get('categories', []):
+        categories.update(categories_prop.value)
+    notes = tuple(note.value for note in contents.get('note', []))
+    return (fn, n, email, tuple(sorted(categories)), notes)
+
+def desired_card_state(user: UserDto, is_parent: bool) -> Tuple:
+    """Normalize the managed fields a card for user should have after an update."""
+    fn = user.parent_fullname if is_parent else safe_string(user.fullname)
+    n = (safe_string(user.lastname), safe_string(user.firstname))
+    email = get_user_email(user, is_parent)
+    categories = tuple(sorted(set(get_final_groups(user.groups, is_parent))))
+    return (fn, n, email, categories, (CONNECTOR_NOTE,))
+
+def card_state_hash(state: Tuple) -> str:
+    """Stable content hash of a normalized card state."""
+    return hashlib.sha1(repr(state).encode('utf-8')).hexdigest()
+
+def _name_part(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(value)
+    return value or ""
 
 @log_execution_time
-def save_vcard(session, vcard: vobject.vCard, href: str, etag: str):
-    """Save a vCard to the CardDAV server."""
+def save_vcard(session, data: str, fullname: str, uid: str, href: Optional[str],
+               etag: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """Save a serialized vCard to the CardDAV server.
+
+    Returns the card's href and the ETag the server sent for the new version, if any.
+    """
     if CONFIG["DRY_RUN"]:
         action = "Would update" if href else "Would create"
-        logger.info(f"[DRY RUN] {action} contact card for: {vcard.fn.value}")
+        logger.info(f"[DRY RUN] {action} contact card for: {fullname}")
         return
 
-    parsed_uri = urlparse(CONFIG['CARDDAV_URL'])
-    url = f"{parsed_uri.scheme}://{parsed_uri.netloc}{href}" if href else f"{CONFIG['CARDDAV_URL']}/{vcard.uid.value}.vcf"
+    url = href_to_url(href) if href else f"{CONFIG['CARDDAV_URL'].rstrip('/')}/{uid}.vcf"
     headers = {
         'Content-Type': 'text/vcard; charset=utf-8',
         'If-Match': etag
     } if etag else {'Content-Type': 'text/vcard; charset=utf-8'}
 
     try:
-        response = session.put(url, data=vcard.serialize(), headers=headers, 
-                               auth=HTTPBasicAuth(CONFIG['CARDDAV_USERNAME'], CONFIG['CARDDAV_PASSWORD']))
+        with metrics.timer("carddav_put"):
+            response = session.put(url, data=data.encode('utf-8'), headers=headers,
+                                   auth=HTTPBasicAuth(CONFIG['CARDDAV_USERNAME'], CONFIG['CARDDAV_PASSWORD']))
         response.raise_for_status()
         action = "Updated" if href else "Created"
-        logger.info(f"{action} contact card for: {vcard.fn.value}")
-        return (response.url, response.headers.get('ETag', '').strip('"'))
+        logger.info(f"{action} contact card for: {fullname}")
+        return href or urlparse(url).path, response.headers.get('ETag', '').strip('"') or None
     except requests.RequestException as e:
-        logger.error(f"Error saving vCard for {vcard.fn.value}: {str(e)}")
+        logger.error(f"Error saving vCard for {fullname}: {str(e)}")
         raise
 
 # Dangling Contacts Management
 
-def load_dangling_contacts_state() -> Dict[str, Dict]:
-    """Load the state of dangling contacts from a file."""
-    state_file = CONFIG["STATE_FILE"]
-    if os.path.exists(state_file):
-        try:
-            with open(state_file, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.error(f"Error decoding JSON from {state_file}. Starting with empty state.")
-    return {}
-
-def save_dangling_contacts_state(state: Dict[str, Dict]):
-    """Save the state of dangling contacts to a file."""
-    state_file = CONFIG["STATE_FILE"]
+def dangling_key(entry: IndexedCard) -> str:
+    """Dangling state follows the card rather than its name: keyed by UID, or by href without one."""
+    return entry.uid or entry.href
+
+def mv_card_names(mv_users: List[UserDto]) -> Set[str]:
+    """Names of all cards MV members and their parents should have."""
+    return {user.fullname for user in mv_users} | {user.parent_fullname for user in mv_users if user.parent_email}
+
+def migrate_dangling_state_file(cache: ContactCache, index: ContactIndex):
+    """Import the name-keyed JSON state of earlier versions into the cache, once."""
+    state_file = CONFIG.get("STATE_FILE")
+    if not state_file or not os.path.exists(state_file):
+        return
     try:
-        with open(state_file, "w") as f:
-            json.dump(state, f)
-    except IOError as e:
-        logger.error(f"Error saving dangling contacts state: {str(e)}")
+        with open(state_file, "r") as f:
+            legacy_state = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Error reading legacy dangling contacts state {state_file}: {str(e)}")
+        legacy_state = {}
+
+    with cache.batch():
+        for name, state in legacy_state.items():
+            entry = index.find_by_fn(name)
+            if entry:
+                cache.set_dangling(dangling_key(entry), entry.href, name, state["first_seen"], state["count"])
+    os.replace(state_file, f"{state_file}.migrated")
+    logger.info(f"Migrated {len(legacy_state)} dangling contacts from {state_file}")
 
 @log_execution_time
-def check_dangling_contacts(session, contacts: List[Tuple[str, str, str]], mv_users: List[UserDto]):
+def check_dangling_contacts(session, cache: ContactCache, index: ContactIndex, mv_users: List[UserDto],
+                            digest: NotificationDigest):
     """Check for and manage dangling contacts."""
     logger.info("Checking for dangling contacts")
-    mv_user_names = set([user.fullname for user in mv_users] + [f"{user.fullname} (Eltern)" for user in mv_users if user.parent_email])
-    dangling_state = load_dangling_contacts_state()
+    mv_user_names = mv_card_names(mv_users)
+    migrate_dangling_state_file(cache, index)
+    dangling_state = cache.dangling()
     current_date = datetime.now().strftime("%Y-%m-%d")
 
-    for href, etag, vcard_string in contacts:
-        vcard = vobject.readOne(vcard_string)
-        if 'note' in vcard.contents and vcard.note.value == "Updated automatically via Python MV Connector":
-            if vcard.fn.value not in mv_user_names:
-                manage_dangling_contact(session, vcard, href, etag, dangling_state, current_date)
-            elif vcard.fn.value in dangling_state:
-                del dangling_state[vcard.fn.value]
-
-    save_dangling_contacts_state(dangling_state)
-
-def manage_dangling_contact(session, vcard, href, etag, dangling_state, current_date):
-    """Manage a single dangling contact."""
-    if vcard.fn.value not in dangling_state:
-        dangling_state[vcard.fn.value] = {"first_seen": current_date, "count": 1}
-        logger.warning(f"New dangling contact found: {vcard.fn.value}")
-        send_email("Dangling Contact Found", f"Dangling contact found: {vcard.fn.value}\nFirst seen on: {current_date}\nThis contact will be automatically deleted after 7 consecutive days.")
-    else:
-        dangling_state[vcard.fn.value]["count"] += 1
-        count = dangling_state[vcard.fn.value]["count"]
-        if count == 4:
-            logger.warning(f"Dangling contact reminder: {vcard.fn.value}")
-            send_email("Dangling Contact Reminder", f"Dangling contact reminder: {vcard.fn.value}\nFirst seen on: {dangling_state[vcard.fn.value]['first_seen']}\nThis contact will be automatically deleted in 3 days if it remains dangling.")
-        elif count >= 7:
-            logger.warning(f"Deleting dangling contact: {vcard.fn.value}")
-            delete_vcard(session, href, etag)
-            del dangling_state[vcard.fn.value]
-            send_email("Dangling Contact Deleted", f"Dangling contact has been automatically deleted: {vcard.fn.value}\nFirst seen on: {dangling_state[vcard.fn.value]['first_seen']}")
+    due_for_deletion = []
+    dangling_keys = set()
+    with cache.batch():
+        for entry in index.entries:
+            if not entry.fn or not entry.managed or entry.fn in mv_user_names or entry.href in index.claimed:
+                continue
+            key = dangling_key(entry)
+            if key in dangling_keys:
+                key = entry.href
+            dangling_keys.add(key)
+            first_seen, count, due = manage_dangling_contact(entry.fn, dangling_state.get(key), current_date, digest)
+            cache.set_dangling(key, entry.href, entry.fn, first_seen, count)
+            if due:
+                due_for_deletion.append((key, entry, first_seen, count))
+        # Cards that are back in MV, were renamed or have disappeared are not dangling anymore
+        cache.clear_dangling(dangling_state.keys() - dangling_keys)
+
+    if CONFIG["DRY_RUN"]:
+        # Nothing is deleted, so the cards stay dangling and are reported once when they become due
+        for key, entry, first_seen, count in due_for_deletion:
+            logger.info(f"[DRY RUN] Would delete dangling contact: {entry.fn}")
+            if count == DANGLING_DELETE_AFTER:
+                digest.add("Dangling Contact Not Deleted (Dry Run)", f"Dangling contact would have been automatically deleted: {entry.fn}\nFirst seen on: {first_seen}\nIt was kept because DRY_RUN is enabled.")
+        return
+
+    outcomes = map_concurrently(lambda item: delete_dangling_vcard(session, item[1]), due_for_deletion)
+    deleted = []
+    for (key, entry, first_seen, count), (_, error) in zip(due_for_deletion, outcomes):
+        if error:
+            logger.error(f"Failed to delete dangling contact {entry.fn}, will retry on next run: {str(error)}")
+            continue
+        deleted.append(key)
+        digest.add("Dangling Contact Deleted", f"Dangling contact has been automatically deleted: {entry.fn}\nFirst seen on: {first_seen}")
+    with cache.batch():
+        cache.clear_dangling(deleted)
+
+def manage_dangling_contact(name: str, previous, current_date: str, digest: NotificationDigest) -> Tuple[str, int, bool]:
+    """Advance the dangling state of a single card.
+
+    Returns the first-seen date, the number of consecutive runs it has been dangling and
+    whether it is due for deletion.
+    """
+    if previous is None:
+        logger.warning(f"New dangling contact found: {name}")
+        digest.add("Dangling Contact Found", f"Dangling contact found: {name}\nFirst seen on: {current_date}\nThis contact will be automatically deleted after {DANGLING_DELETE_AFTER} consecutive days.")
+        return current_date, 1, False
+
+    first_seen, count = previous["first_seen"], previous["count"] + 1
+    if count == DANGLING_REMINDER_AFTER:
+        logger.warning(f"Dangling contact reminder: {name}")
+        digest.add("Dangling Contact Reminder", f"Dangling contact reminder: {name}\nFirst seen on: {first_seen}\nThis contact will be automatically deleted in {DANGLING_DELETE_AFTER - DANGLING_REMINDER_AFTER} days if it remains dangling.")
+    elif count >= DANGLING_DELETE_AFTER:
+        logger.warning(f"Deleting dangling contact: {name}")
+        return first_seen, count, True
+    return first_seen, count, False
+
+def delete_dangling_vcard(session, entry: IndexedCard):
+    """Delete a dangling card, rechecking it first if it was changed on the server in the meantime."""
+    for attempt in range(CONFLICT_RETRIES + 1):
+        try:
+            return delete_vcard(session, entry.href, entry.etag)
+        except requests.HTTPError as e:
+            if not is_precondition_failed(e) or attempt == CONFLICT_RETRIES:
+                raise
+            logger.warning(f"Dangling contact {entry.fn} changed on the server, refetching before deleting")
+            if not refresh_card(session, entry):
+                return
+            if not entry.managed:
+                raise Exception(f"Contact card {entry.href} is no longer managed by the connector, not deleting it")
 
 def delete_vcard(session, href: str, etag: str):
     """Delete a vCard from the CardDAV server."""
@@ -277,11 +488,12 @@ def delete_vcard(session, href: str, etag: str):
         logger.info(f"[DRY RUN] Would delete contact card: {href}")
         return
 
-    url = f"{CONFIG['CARDDAV_URL']}{href}"
+    url = href_to_url(href)
     headers = {'If-Match': etag} if etag else {}
     
     try:
-        response = session.delete(url, headers=headers, auth=HTTPBasicAuth(CONFIG['CARDDAV_USERNAME'], CONFIG['CARDDAV_PASSWORD']))
+        with metrics.timer("carddav_delete"):
+            response = session.delete(url, headers=headers, auth=HTTPBasicAuth(CONFIG['CARDDAV_USERNAME'], CONFIG['CARDDAV_PASSWORD']))
         response.raise_for_status()
         logger.info(f"Deleted contact card: {href}")
     except requests.RequestException as e:
@@ -291,67 +503,186 @@ def delete_vcard(session, href: str, etag: str):
 # Main Synchronization Function
 
 @log_execution_time
-def sync_contacts():
-    """Main function to synchronize contacts between MV and CardDAV."""
+def sync_contacts(job: Optional[SyncJob] = None, mv_users: Optional[List[UserDto]] = None) -> Dict[str, int]:
+    """Main function to synchronize contacts between MV and CardDAV.
+
+    When run as a job, progress is reported on it and cancellation is honoured between users.
+    mv_users can be passed in when the MV export was already downloaded, e.g. for several tenants.
+    """
     logger.info("Starting contact synchronization")
+    run_metrics = metrics.start_run()
+
+    def report(**fields):
+        if job:
+            job.raise_if_cancelled()
+            job.update_progress(**fields)
+
     failed_contacts = []
+    stats = {"created": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    cache = ContactCache()
+    # Notifications are collected during the run and sent as one email in the background
+    tenant = CONFIG.get("TENANT_NAME")
+    digest = NotificationDigest(f"Contact Synchronization Report ({tenant})" if tenant else "Contact Synchronization Report")
     try:
+        compile_group_resolver()
         session = connect_to_carddav()
-        contacts = fetch_contacts(session)
-        mv_users = fetch_users_from_mv()
+        report(phase="fetching_contacts")
+        fetch_contacts(session, cache)
+        report(phase="indexing_contacts")
+        index = build_contact_index(cache)
+        report(phase="fetching_members")
+        if mv_users is None:
+            mv_users = fetch_users_from_mv(stats)
+        # An empty member list would mark every card as dangling, as in tenant syncs this is a failure
+        if not mv_users:
+            raise Exception("MV export could not be downloaded or was empty")
+        report(phase="updating_contacts", processed=0, total=len(mv_users))
+        index.collect_orphans(mv_card_names(mv_users))
         
+        # Users sharing a name resolve to the same card, so they are handled by one worker in order
+        users_by_name: Dict[str, List[UserDto]] = {}
         for user in mv_users:
-            try:
-                update_or_create_contact_card(session, contacts, user)
-            except Exception as e:
-                logger.error(f"Error processing user {user.fullname}: {str(e)}")
-                failed_contacts.append((user.fullname, str(e)))
+            users_by_name.setdefault(user.fullname, []).append(user)
+
+        def process_users(users: List[UserDto]) -> List[Tuple[List[str], List[Tuple[str, str]]]]:
+            results = []
+            for user in users:
+                if job:
+                    job.raise_if_cancelled()
+                actions, errors = update_or_create_contact_card(session, index, user)
+                results.append((actions, errors))
+                if job:
+                    job.advance("processed")
+                    for action in actions:
+                        job.advance(action)
+                    if errors:
+                        job.advance("failed", len(errors))
+            return results
+
+        outcomes = map_concurrently(process_users, list(users_by_name.values()))
+        report(phase="checking_dangling_contacts")
+        for results, _ in outcomes:
+            if results is None:
+                continue
+            # Each card counts on its own, so a failed member card does not hide a saved parent card
+            for actions, errors in results:
+                for action in actions:
+                    stats[action] += 1
+                failed_contacts.extend(errors)
         
-        check_dangling_contacts(session, contacts, mv_users)
-        logger.info("Contact synchronization completed")
+        check_dangling_contacts(session, cache, index, mv_users, digest)
+        logger.info(f"Contact synchronization completed: {stats['created']} created, "
+                    f"{stats['updated']} updated, {stats['unchanged']} unchanged")
+        report(phase="done")
+        metrics.SYNC_RUNS.inc(status="completed")
+    except SyncCancelled:
+        logger.warning("Contact synchronization cancelled")
+        metrics.SYNC_RUNS.inc(status="cancelled")
+        raise
     except Exception as e:
         logger.error(f"Error during contact synchronization: {str(e)}")
-        send_email("Synchronization Error", f"An error occurred during contact synchronization: {str(e)}")
+        metrics.SYNC_RUNS.inc(status="failed")
+        stats["error"] = str(e)
+        digest.add("Synchronization Error", f"An error occurred during contact synchronization: {str(e)}")
     finally:
+        try:
+            # Keeps the cards saved so far, even when the run failed after writing them
+            cache.commit()
+        finally:
+            cache.close()
+        stats["failed"] = len(failed_contacts)
+        stats["failed_contacts"] = [{"name": name, "error": error} for name, error in failed_contacts]
         if failed_contacts:
-            log_failed_contacts(failed_contacts)
+            log_failed_contacts(failed_contacts, digest)
         else:
             logger.info("All contacts synced successfully")
+        digest.send()
+        for action in ("created", "updated", "unchanged", "failed"):
+            metrics.CONTACT_ACTIONS.inc(stats[action], action=action)
+        stats["breakdown"] = run_metrics.to_dict()
+    return stats
+
+def sync_contact_card(session, index: ContactIndex, user: UserDto, is_parent: bool) -> str:
+    """Bring a single user or parent card in line with MV data.
 
-def update_or_create_contact_card(session, contacts: List[Tuple[str, str, str]], user: UserDto):
-    """Update or create a contact card for a user and their parent if applicable."""
+    Returns 'created', 'updated' or 'unchanged'.
+    """
+    fullname = user.parent_fullname if is_parent else user.fullname
+    desired = desired_card_state(user, is_parent)
+    entry = index.find_by_fn(fullname)
+    if entry and entry.state_hash == card_state_hash(desired):
+        logger.debug(f"Contact card unchanged for: {fullname}")
+        return "unchanged"
+    if entry is None:
+        entry = index.claim_orphan(desired[2])
+        if entry:
+            logger.info(f"Renaming contact card {entry.fn} to {fullname}")
+
+    fields = managed_fields(user, is_parent)
+    for attempt in range(CONFLICT_RETRIES + 1):
+        data, uid = render_vcard(entry, fields)
+        try:
+            saved = save_vcard(session, data, fullname, uid, entry.href if entry else None,
+                               entry.etag if entry else None)
+            break
+        except requests.HTTPError as e:
+            # The card was edited on the server since it was fetched: apply the update to the current version
+            if entry is None or not is_precondition_failed(e) or attempt == CONFLICT_RETRIES:
+                raise
+            logger.warning(f"Contact card for {fullname} changed on the server, refetching and retrying")
+            if not refresh_card(session, entry):
+                raise Exception(f"Contact card for {fullname} was deleted on the server during the sync")
+    if saved and index.cache is not None:
+        remember_saved_card(index.cache, entry, saved, data, card_state_hash(desired))
+    return "updated" if entry else "created"
+
+def remember_saved_card(cache: ContactCache, entry: Optional[IndexedCard], saved: Tuple[str, Optional[str]],
+                        data: str, state_hash: str):
+    """Cache a card just written, so the next fetch does not download it again.
+
+    Without an ETag the server may have altered the card while storing it, so it is dropped
+    from the cache instead and downloaded on the next fetch. The rows are committed with the run.
+    """
+    href, etag = saved
+    if not etag:
+        cache.evict([href])
+        return
+    cache.store(href, etag, data)
+    if entry is not None:
+        entry.etag, entry.state_hash, entry._vcard = etag, state_hash, None
+
+def update_or_create_contact_card(session, index: ContactIndex, user: UserDto) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Update or create a contact card for a user and their parent if applicable.
+
+    Returns the actions of the cards that were synced and (card name, error) for those that failed.
+    """
     logger.info(f"Processing user: {user.fullname}")
     errors = []
+    actions = []
 
     # Process user contact
     try:
-        user_vcard, user_href, user_etag = find_or_create_vcard(contacts, user.fullname)
-        update_vcard(user_vcard, user, is_parent=False)
-        save_vcard(session, user_vcard, user_href, user_etag)
+        actions.append(sync_contact_card(session, index, user, is_parent=False))
     except Exception as e:
         logger.error(f"Error processing user contact for {user.fullname}: {str(e)}")
-        errors.append(f"User contact: {str(e)}")
+        errors.append((user.fullname, f"User contact: {str(e)}"))
 
     # Process parent contact if parent email exists
-    if pd.notna(user.parent_email) and user.parent_email.lower() != "nan":
+    if user.parent_email:
         try:
-            parent_vcard, parent_href, parent_etag = find_or_create_vcard(contacts, f"{user.fullname} (Eltern)")
-            update_vcard(parent_vcard, user, is_parent=True)
-            save_vcard(session, parent_vcard, parent_href, parent_etag)
+            actions.append(sync_contact_card(session, index, user, is_parent=True))
         except Exception as e:
             logger.error(f"Error processing parent contact for {user.fullname}: {str(e)}")
-            errors.append(f"Parent contact: {str(e)}")
+            errors.append((user.parent_fullname, f"Parent contact: {str(e)}"))
 
-    # If any errors occurred, raise an exception with all error messages
-    if errors:
-        raise Exception("; ".join(errors))
+    return actions, errors
 
-def log_failed_contacts(failed_contacts):
-    """Log and send an email about failed contacts."""
+def log_failed_contacts(failed_contacts, digest: NotificationDigest):
+    """Log failed contacts and add them to the notification digest."""
     logger.error("The following contacts failed to sync:")
     for name, error in failed_contacts:
         logger.error(f"- {name}: {error}")
-    send_email(
+    digest.add(
         "Failed Contacts During Sync",
         "The following contacts failed to sync:\n" + 
         "\n".join([f"- {name}: {error}" for name, error in failed_contacts])
@@ -1,11 +1,19 @@
 # config.py
+import copy
+import fcntl
 import json
 import logging
 import os
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
 from logging.handlers import RotatingFileHandler
+from typing import Callable, Dict, Iterator, List, Optional
 
-CONFIG_FILE = '/app/config/config.json'
-LOG_DIR = '/app/logs'
+CONFIG_FILE = os.environ.get('CONFIG_FILE', '/app/config/config.json')
+LOG_DIR = os.environ.get('LOG_DIR', '/app/logs')
 LOG_FILE = os.path.join(LOG_DIR, 'carddav_sync.log')
 
 def load_config():
@@ -13,10 +21,204 @@ def load_config():
         return json.load(f)
 
 def save_config(config):
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
+    """Write config to CONFIG_FILE atomically, so readers never see a partly written file."""
+    directory = os.path.dirname(os.path.abspath(CONFIG_FILE))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.config-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(config, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(CONFIG_FILE):
+            os.chmod(tmp_path, os.stat(CONFIG_FILE).st_mode & 0o777)
+        os.replace(tmp_path, CONFIG_FILE)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
-CONFIG = load_config()
+# Versioned Configuration
+
+class ConfigSnapshot(Mapping):
+    """One immutable version of the configuration.
+
+    Values are deep copies of what was loaded or saved, so later changes never leak into a
+    snapshot that a running sync still uses.
+    """
+
+    __slots__ = ('version', '_data')
+
+    def __init__(self, version: int, data: Dict):
+        self.version = version
+        self._data = copy.deepcopy(data)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def to_dict(self) -> Dict:
+        return copy.deepcopy(self._data)
+
+class ConfigStore:
+    """Holds the current configuration snapshot and publishes new versions.
+
+    Changes are applied as a whole under a lock and produce a new snapshot, so readers see
+    either the old or the new configuration, never a mix. A thread can pin a snapshot with
+    pinned(); until it is released, that thread keeps reading the pinned version.
+    """
+
+    def __init__(self, data: Dict):
+        self._lock = threading.Lock()
+        self._snapshot = ConfigSnapshot(1, data)
+        self._local = threading.local()
+        self._listeners: List[Callable[[ConfigSnapshot, ConfigSnapshot], None]] = []
+        self._file_stamp = self._stat()
+
+    @property
+    def latest(self) -> ConfigSnapshot:
+        return self._snapshot
+
+    def current(self) -> ConfigSnapshot:
+        """The snapshot pinned by the calling thread, or the latest one."""
+        return getattr(self._local, 'snapshot', None) or self._snapshot
+
+    @contextmanager
+    def pinned(self, snapshot: Optional[ConfigSnapshot] = None) -> Iterator[ConfigSnapshot]:
+        """Make the calling thread read snapshot (default: the current one) until the block ends."""
+        snapshot = snapshot or self.current()
+        previous = getattr(self._local, 'snapshot', None)
+        self._local.snapshot = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._local.snapshot = previous
+
+    def subscribe(self, listener: Callable[[ConfigSnapshot, ConfigSnapshot], None]):
+        """Call listener(old, new) after every published change."""
+        self._listeners.append(listener)
+
+    def update(self, changes: Dict, persist: bool = True) -> ConfigSnapshot:
+        """Apply changes on top of the latest configuration. Nothing is written if no value changes.
+
+        The file is re-read first under an exclusive file lock, so a change saved by another
+        process (e.g. another API worker) since the last reload is kept rather than overwritten.
+        """
+        with self._lock, (self._file_lock() if persist else nullcontext()):
+            self._reload_locked()
+            data = self._snapshot.to_dict()
+            data.update(copy.deepcopy(changes))
+            return self._publish(data, persist)
+
+    def replace(self, data: Dict, persist: bool = False) -> ConfigSnapshot:
+        """Swap in a complete configuration, e.g. a tenant's in its worker process."""
+        with self._lock, (self._file_lock() if persist else nullcontext()):
+            return self._publish(data, persist)
+
+    def reload_if_changed(self) -> bool:
+        """Apply edits made to CONFIG_FILE by something else. Returns whether a new version was published."""
+        with self._lock:
+            return self._reload_locked()
+
+    def _reload_locked(self) -> bool:
+        # Called with the lock held
+        stamp = self._stat()
+        if stamp is None or stamp == self._file_stamp:
+            return False
+        try:
+            data = load_config()
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable configuration file {CONFIG_FILE}: {e}")
+            return False
+        self._file_stamp = stamp
+        old = self._snapshot
+        new = self._publish(data, persist=False)
+        if new is not old:
+            logger.info(f"Applied external changes to {CONFIG_FILE} as configuration version {new.version}")
+        return new is not old
+
+    @staticmethod
+    @contextmanager
+    def _file_lock() -> Iterator[None]:
+        """Serialize read-modify-write cycles on CONFIG_FILE across processes."""
+        with open(f"{CONFIG_FILE}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _publish(self, data: Dict, persist: bool) -> ConfigSnapshot:
+        # Called with the lock held
+        old = self._snapshot
+        if data == old._data:
+            return old
+        if persist:
+            save_config(data)
+            self._file_stamp = self._stat()
+        self._snapshot = ConfigSnapshot(old.version + 1, data)
+        for listener in self._listeners:
+            try:
+                listener(old, self._snapshot)
+            except Exception as e:
+                logger.error(f"Configuration listener failed: {e}", exc_info=True)
+        return self._snapshot
+
+    @staticmethod
+    def _stat():
+        try:
+            stat = os.stat(CONFIG_FILE)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+class ConfigView(Mapping):
+    """Read-only view of the configuration in effect for the calling thread."""
+
+    def __init__(self, store: ConfigStore):
+        self._store = store
+
+    @property
+    def version(self) -> int:
+        return self._store.current().version
+
+    def __getitem__(self, key):
+        return self._store.current()[key]
+
+    def __iter__(self):
+        return iter(self._store.current())
+
+    def __len__(self):
+        return len(self._store.current())
+
+config_store = ConfigStore(load_config())
+CONFIG = ConfigView(config_store)
+
+def watch_config_file(interval: Optional[float] = None) -> Optional[threading.Thread]:
+    """Poll CONFIG_FILE in a background thread and publish external edits.
+
+    The interval is CONFIG_WATCH_INTERVAL seconds (default 5), and 0 disables the watcher.
+    """
+    interval = CONFIG.get("CONFIG_WATCH_INTERVAL", 5) if interval is None else interval
+    if not interval or interval <= 0:
+        return None
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                config_store.reload_if_changed()
+            except Exception as e:
+                logger.error(f"Configuration watcher failed: {e}", exc_info=True)
+
+    thread = threading.Thread(target=watch, name="config-watcher", daemon=True)
+    thread.start()
+    logger.info(f"Watching {CONFIG_FILE} for changes every {interval}s")
+    return thread
 
 # Ensure log directory exists
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -35,4 +237,15 @@ root_logger = logging.getLogger()
 root_logger.addHandler(file_handler)
 
 # Create a logger for this module
-logger = logging.getLogger(__name__)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+def set_log_file(path: str):
+    """Send file logging to path instead of LOG_FILE, e.g. for a tenant's worker process."""
+    global file_handler
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    new_handler = RotatingFileHandler(path, maxBytes=10*1024*1024, backupCount=5)
+    new_handler.setFormatter(file_handler.formatter)
+    root_logger.removeHandler(file_handler)
+    file_handler.close()
+    root_logger.addHandler(new_handler)
+    file_handler = new_handler
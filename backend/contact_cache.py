@@ -0,0 +1,150 @@
+# contact_cache.py
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+from config import CONFIG
+
+DEFAULT_CACHE_FILE = '/app/data/contacts_cache.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    href TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    vcard TEXT NOT NULL,
+    parsed INTEGER NOT NULL DEFAULT 0,
+    uid TEXT,
+    fn TEXT,
+    emails TEXT,
+    managed INTEGER NOT NULL DEFAULT 0,
+    state_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_fn ON contacts (fn);
+CREATE INDEX IF NOT EXISTS contacts_uid ON contacts (uid);
+CREATE TABLE IF NOT EXISTS dangling (
+    key TEXT PRIMARY KEY,
+    href TEXT NOT NULL,
+    name TEXT,
+    first_seen TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class ContactCache:
+    """On-disk copy of the address book keyed by href and ETag.
+
+    Raw cards are stored together with the fields the sync needs (UID, FN, emails,
+    connector flag and normalized state hash), so unchanged cards never have to be
+    downloaded or parsed again.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or CONFIG.get("CONTACT_CACHE_FILE", DEFAULT_CACHE_FILE)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """Group writes into one transaction that is rolled back on error."""
+        with self._lock:
+            try:
+                yield self
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    # Sync token
+
+    def get_sync_token(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'sync_token'").fetchone()
+        return row[0] if row else None
+
+    def set_sync_token(self, sync_token: Optional[str]):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('sync_token', ?)", (sync_token,))
+
+    # Cards
+
+    def etags(self) -> Dict[str, str]:
+        """Map every cached href to its ETag."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT href, etag FROM contacts"))
+
+    def store(self, href: str, etag: str, vcard: str):
+        """Store a downloaded card. Its derived fields are recomputed on next index build."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO contacts (href, etag, vcard, parsed) VALUES (?, ?, ?, 0)",
+                (href, etag, vcard))
+
+    def store_metadata(self, href: str, uid: Optional[str], fn: Optional[str], emails: List[str],
+                       managed: bool, state_hash: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE contacts SET parsed = 1, uid = ?, fn = ?, emails = ?, managed = ?, state_hash = ? WHERE href = ?",
+                (uid, fn, "\n".join(emails), int(managed), state_hash, href))
+
+    def evict(self, hrefs: Iterable[str]):
+        """Drop cards that no longer exist on the server."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM contacts WHERE href = ?", ((href,) for href in hrefs))
+
+    def get_vcard(self, href: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT vcard FROM contacts WHERE href = ?", (href,)).fetchone()
+        return row[0] if row else None
+
+    def rows(self) -> List[sqlite3.Row]:
+        """All cards without their raw vCard text."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT href, etag, parsed, uid, fn, emails, managed, state_hash FROM contacts")
+            cursor.row_factory = sqlite3.Row
+            return cursor.fetchall()
+
+    def counts(self) -> Dict[str, int]:
+        """Contact counts for the dashboard, answered without contacting the server."""
+        with self._lock:
+            total, managed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(managed), 0) FROM contacts").fetchone()
+        return {"total": total, "managed": managed}
+
+    # Dangling contacts, keyed by UID (or href for cards without one)
+
+    def dangling(self) -> Dict[str, sqlite3.Row]:
+        with self._lock:
+            cursor = self._conn.execute("SELECT key, href, name, first_seen, count FROM dangling")
+            cursor.row_factory = sqlite3.Row
+            return {row['key']: row for row in cursor}
+
+    def set_dangling(self, key: str, href: str, name: str, first_seen: str, count: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dangling (key, href, name, first_seen, count) VALUES (?, ?, ?, ?, ?)",
+                (key, href, name, first_seen, count))
+
+    def clear_dangling(self, keys: Iterable[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM dangling WHERE key = ?", ((key,) for key in keys))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
@@ -0,0 +1,98 @@
+# group_mapping.py
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import ConfigSnapshot, config_store, logger
+
+PARENT_GROUP = 'Eltern'
+
+class GroupResolver:
+    """Resolves MV groups to the categories of a card.
+
+    GROUP_MAPPING values may be a single group or a list of groups, and mapped groups
+    are themselves mapped again (transitively). The closure is computed once when the
+    resolver is built, and the final category tuple is memoized per (groups, is_parent).
+    """
+
+    def __init__(self, group_mapping: Dict[str, object], default_group: Optional[str],
+                 map_parents: bool, default_for_parents: bool):
+        self.default_group = default_group
+        self.map_parents = map_parents
+        self.default_for_parents = default_for_parents
+        self.closure = self._compile(group_mapping)
+        self._memo: Dict[Tuple[Tuple[str, ...], bool], Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _compile(group_mapping: Dict[str, object]) -> Dict[str, Tuple[str, ...]]:
+        direct = {}
+        for group, targets in group_mapping.items():
+            if isinstance(targets, str):
+                targets = [targets]
+            direct[group] = [target for target in targets if target]
+
+        closure = {}
+        for group in direct:
+            resolved, stack, seen = [], list(reversed(direct[group])), {group}
+            while stack:
+                target = stack.pop()
+                if target in seen:
+                    continue
+                seen.add(target)
+                resolved.append(target)
+                stack.extend(reversed(direct.get(target, [])))
+            closure[group] = tuple(resolved)
+        return closure
+
+    def resolve(self, groups: Iterable[str], is_parent: bool) -> Tuple[str, ...]:
+        """Final categories for a card, in stable order and without duplicates."""
+        key = (tuple(groups), is_parent)
+        categories = self._memo.get(key)
+        if categories is None:
+            categories = self._resolve(*key)
+            with self._lock:
+                self._memo[key] = categories
+        return categories
+
+    def _resolve(self, groups: Tuple[str, ...], is_parent: bool) -> Tuple[str, ...]:
+        categories = list(groups)
+        if not is_parent or self.map_parents:
+            for group in groups:
+                categories.extend(self.closure.get(group, ()))
+        if self.default_group and (not is_parent or self.default_for_parents):
+            categories.append(self.default_group)
+        if is_parent:
+            categories.append(PARENT_GROUP)
+        return tuple(dict.fromkeys(categories))
+
+# Resolvers by configuration snapshot. A sync pinned to an older version, or a tenant's
+# configuration, keeps its own resolver while requests on the latest version use another one.
+# Entries hold on to their snapshot, so its id is not reused while the entry exists.
+_resolvers: Dict[int, Tuple[ConfigSnapshot, GroupResolver]] = {}
+_resolver_lock = threading.Lock()
+MAX_RESOLVERS = 8
+
+def compile_group_resolver() -> GroupResolver:
+    """Build a resolver from the configuration in effect and make it the active one for that snapshot."""
+    snapshot = config_store.current()
+    resolver = GroupResolver(
+        snapshot.get("GROUP_MAPPING", {}),
+        snapshot.get("DEFAULT_GROUP"),
+        snapshot.get("APPLY_GROUP_MAPPING_TO_PARENTS", False),
+        snapshot.get("APPLY_DEFAULT_GROUP_TO_PARENTS", True)
+    )
+    with _resolver_lock:
+        _resolvers[id(snapshot)] = (snapshot, resolver)
+        # Dicts keep insertion order, so the oldest resolvers are dropped first
+        for key in list(_resolvers)[:-MAX_RESOLVERS]:
+            del _resolvers[key]
+    logger.debug(f"Compiled group mapping for {len(resolver.closure)} groups (config version {snapshot.version})")
+    return resolver
+
+def get_group_resolver() -> GroupResolver:
+    """Return the resolver for the configuration in effect, compiling it on first use."""
+    snapshot = config_store.current()
+    entry = _resolvers.get(id(snapshot))
+    return entry[1] if entry is not None and entry[0] is snapshot else compile_group_resolver()
+
+def resolve_groups(groups: Iterable[str], is_parent: bool) -> List[str]:
+    return list(get_group_resolver().resolve(groups, is_parent))
@@ -0,0 +1,15 @@
+# gunicorn.conf.py
+"""gunicorn settings for the API. Syncs run in the separate worker process (worker.py)."""
+import os
+
+bind = os.environ.get("API_BIND", "0.0.0.0:5000")
+# Threaded workers, so long-lived /events streams do not block other requests
+worker_class = "gthread"
+workers = int(os.environ.get("API_WORKERS", 2))
+threads = int(os.environ.get("API_THREADS", 8))
+timeout = 120
+
+def post_fork(server, worker):
+    # Each API worker keeps its own configuration snapshot and follows changes made by the others
+    from config import watch_config_file
+    watch_config_file()
@@ -0,0 +1,161 @@
+# history.py
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from config import CONFIG
+
+DEFAULT_HISTORY_FILE = '/app/data/sync_history.db'
+# Count fields of a run, as reported in the sync stats
+COUNT_FIELDS = ("created", "updated", "unchanged", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    trigger TEXT,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    duration_seconds REAL NOT NULL,
+    config_version INTEGER,
+    created INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    unchanged INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    throughput REAL,
+    error TEXT,
+    phases TEXT,
+    failed_contacts TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, started_at);
+"""
+
+# Columns returned in run listings, without the potentially large JSON columns
+SUMMARY_COLUMNS = ("id", "trigger", "status", "started_at", "finished_at", "duration_seconds", "config_version",
+                   "created", "updated", "unchanged", "failed", "throughput", "error")
+JSON_COLUMNS = ("phases", "failed_contacts", "details")
+
+def collect_failed_contacts(stats: Dict) -> List[Dict]:
+    """Failed contacts of a run, including those of every tenant."""
+    failed = list(stats.get("failed_contacts") or [])
+    for tenant, result in (stats.get("tenants") or {}).items():
+        failed.extend(dict(item, tenant=tenant) for item in result.get("failed_contacts") or [])
+    return failed
+
+class HistoryStore:
+    """Append-only record of finished sync runs.
+
+    Runs are only ever inserted, never rewritten. Listings page through an index on the
+    start time, and percentiles and trends are computed in SQLite rather than over the
+    full history in Python.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or CONFIG.get("HISTORY_FILE", DEFAULT_HISTORY_FILE)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Recording
+
+    def record(self, run_id: str, trigger: Optional[str], status: str, started_at: datetime, finished_at: datetime,
+               stats: Optional[Dict] = None, config_version: Optional[int] = None) -> Dict:
+        """Append a finished run built from the stats returned by the sync."""
+        stats = stats or {}
+        duration = max(0.0, (finished_at - started_at).total_seconds())
+        counts = {field: int(stats.get(field, 0)) for field in COUNT_FIELDS}
+        processed = counts["created"] + counts["updated"] + counts["unchanged"]
+        details = {key: value for key, value in stats.items()
+                   if key not in COUNT_FIELDS and key not in ("error", "breakdown", "failed_contacts")}
+        run = {
+            "id": run_id,
+            "trigger": trigger,
+            "status": status,
+            "started_at": started_at.isoformat(),
+            "finished_at": finished_at.isoformat(),
+            "duration_seconds": round(duration, 3),
+            "config_version": config_version,
+            **counts,
+            "throughput": round(processed / duration, 2) if duration > 0 else None,
+            "error": stats.get("error"),
+            "phases": (stats.get("breakdown") or {}).get("phases"),
+            "failed_contacts": collect_failed_contacts(stats),
+            "details": details
+        }
+        row = dict(run)
+        for column in JSON_COLUMNS:
+            row[column] = json.dumps(row[column])
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        with self._lock:
+            self._conn.execute(f"INSERT INTO runs ({columns}) VALUES ({placeholders})", tuple(row.values()))
+            self._conn.commit()
+        return run
+
+    # Queries
+
+    def list_runs(self, page: int = 1, per_page: int = 20, status: Optional[str] = None) -> Tuple[List[Dict], int]:
+        """One page of runs, newest first, and the total number of matching runs."""
+        where, params = ("WHERE status = ?", [status]) if status else ("", [])
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM runs {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs {where} ORDER BY started_at DESC LIMIT ? OFFSET ?",
+                params + [per_page, (page - 1) * per_page]).fetchall()
+        return [dict(row) for row in rows], total
+
+    def get_run(self, run_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        for column in JSON_COLUMNS:
+            run[column] = json.loads(run[column]) if run[column] else None
+        return run
+
+    def _percentile(self, column: str, percentile: float, since: str) -> Optional[float]:
+        """Nearest-rank percentile of column over completed runs since the given start time."""
+        # Called with the lock held
+        count = self._conn.execute(
+            f"SELECT COUNT({column}) FROM runs WHERE status = 'completed' AND started_at >= ?", (since,)).fetchone()[0]
+        if not count:
+            return None
+        rank = max(1, -(-count * percentile // 100))
+        row = self._conn.execute(
+            f"SELECT {column} FROM runs WHERE status = 'completed' AND started_at >= ? AND {column} IS NOT NULL "
+            f"ORDER BY {column} LIMIT 1 OFFSET ?", (since, int(rank) - 1)).fetchone()
+        return row[0]
+
+    def aggregate(self, days: int = 30) -> Dict:
+        """Run counts, duration and throughput percentiles and a daily trend for the last days."""
+        since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        with self._lock:
+            statuses = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM runs WHERE started_at >= ? GROUP BY status", (since,)).fetchall())
+            durations = {f"p{p}": self._percentile("duration_seconds", p, since) for p in (50, 95)}
+            throughput = {f"p{p}": self._percentile("throughput", p, since) for p in (50, 95)}
+            trend = self._conn.execute(
+                "SELECT substr(started_at, 1, 10) AS day, COUNT(*) AS runs, "
+                "SUM(status = 'failed') AS failed_runs, ROUND(AVG(duration_seconds), 3) AS avg_duration_seconds, "
+                "SUM(created) AS created, SUM(updated) AS updated, SUM(failed) AS failed_contacts "
+                "FROM runs WHERE started_at >= ? GROUP BY day ORDER BY day", (since,)).fetchall()
+        return {
+            "days": days,
+            "runs": sum(statuses.values()),
+            "statuses": statuses,
+            "duration_seconds": durations,
+            "throughput": throughput,
+            "trend": [dict(row) for row in trend]
+        }
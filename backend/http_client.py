@@ -0,0 +1,121 @@
+# http_client.py
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple, Union
+import requests
+from requests.adapters import HTTPAdapter
+from config import CONFIG, logger
+import metrics
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Upper bound for a server-requested Retry-After, so one bad header cannot park a sync for hours
+MAX_RETRY_AFTER = 300
+
+class TokenBucket:
+    """Thread-safe token bucket allowing rate requests per second with bursts of up to burst."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now and sleep outside the lock, so waiters queue up in order
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+def get_timeout() -> Union[float, Tuple[float, float]]:
+    """HTTP_TIMEOUT is either one number or a [connect, read] pair, in seconds."""
+    timeout = CONFIG.get("HTTP_TIMEOUT", [10, 60])
+    return tuple(timeout) if isinstance(timeout, (list, tuple)) else float(timeout)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class RetryingSession(requests.Session):
+    """requests session with default timeouts, rate limiting and retries.
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with jittered exponential
+    backoff. A Retry-After header sent by the server takes precedence over the backoff.
+    """
+
+    def __init__(self, target: str, rate_limit: float = 0, burst: Optional[float] = None):
+        super().__init__()
+        self.target = target
+        self.retries = max(0, int(CONFIG.get("HTTP_RETRIES", 4)))
+        self.backoff_base = float(CONFIG.get("HTTP_BACKOFF_BASE", 0.5))
+        self.backoff_max = float(CONFIG.get("HTTP_BACKOFF_MAX", 30))
+        self.timeout = get_timeout()
+        self.limiter = TokenBucket(rate_limit, burst) if rate_limit and rate_limit > 0 else None
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number attempt + 1."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            if self.limiter:
+                self.limiter.acquire()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff(attempt)
+                reason = type(e).__name__
+                logger.warning(f"{method} {url} failed ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = min(retry_after, MAX_RETRY_AFTER) if retry_after is not None else self.backoff(attempt)
+                reason = str(response.status_code)
+                response.close()
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            metrics.HTTP_RETRIES.inc(target=self.target, reason=reason)
+            time.sleep(delay)
+            attempt += 1
+
+def create_session(target: str, pool_size: int = 10) -> RetryingSession:
+    """Build an instrumented, rate-limited session for target ('carddav' or 'mv').
+
+    The rate limit is read from <TARGET>_RATE_LIMIT (requests per second, 0 disables it)
+    and <TARGET>_RATE_BURST.
+    """
+    prefix = target.upper()
+    session = RetryingSession(target, float(CONFIG.get(f"{prefix}_RATE_LIMIT", 0)),
+                              CONFIG.get(f"{prefix}_RATE_BURST"))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return metrics.instrument_session(session, target)
+
+def is_precondition_failed(error: Exception) -> bool:
+    """Whether error is the 412 answer to a conditional (If-Match) request."""
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.HTTPError) and response is not None and response.status_code == 412
@@ -0,0 +1,204 @@
+# jobs.py
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, Optional, Tuple
+from config import logger
+
+# Number of finished jobs kept for the API
+JOB_HISTORY_SIZE = 20
+
+class SyncCancelled(Exception):
+    """Raised inside a sync when its job has been cancelled."""
+
+class SyncJob:
+    """A queued or running synchronization, with progress reported by the sync itself."""
+
+    def __init__(self, trigger: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.status = "queued"
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.coalesced_triggers = 0
+        self.progress: Dict = {}
+        self.result = None
+        self.error: Optional[str] = None
+        self.config_version: Optional[int] = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._phase_started_at: Optional[float] = None
+        self._on_change: Optional[Callable[[], None]] = None
+
+    def update_progress(self, **fields):
+        with self._lock:
+            if "phase" in fields and fields["phase"] != self.progress.get("phase"):
+                self._phase_started_at = time.time()
+            self.progress.update(fields)
+        self._notify()
+
+    def advance(self, key: str, amount: int = 1):
+        with self._lock:
+            self.progress[key] = self.progress.get(key, 0) + amount
+        self._notify()
+
+    def _notify(self):
+        if self._on_change:
+            self._on_change()
+
+    def _eta_seconds(self) -> Optional[float]:
+        processed, total = self.progress.get("processed"), self.progress.get("total")
+        if not processed or not total or self._phase_started_at is None:
+            return None
+        elapsed = time.time() - self._phase_started_at
+        return round(elapsed / processed * (total - processed), 1)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._cancel_event.is_set():
+            raise SyncCancelled(f"Job {self.id} was cancelled")
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            progress = dict(self.progress)
+            progress["eta_seconds"] = self._eta_seconds()
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "coalesced_triggers": self.coalesced_triggers,
+            "config_version": self.config_version,
+            "cancel_requested": self.cancel_requested,
+            "progress": progress,
+            "result": self.result,
+            "error": self.error
+        }
+
+class SyncJobRunner:
+    """Runs sync jobs one at a time on a single worker thread.
+
+    At most one job waits in the queue: triggers arriving while a job is queued are
+    coalesced into it, so repeated clicks never stack up runs.
+    """
+
+    def __init__(self, target: Callable[[SyncJob], object]):
+        self._target = target
+        self._condition = threading.Condition()
+        self._pending: Deque[SyncJob] = deque()
+        self._running: Optional[SyncJob] = None
+        self._finished: Deque[SyncJob] = deque(maxlen=JOB_HISTORY_SIZE)
+        self._jobs: Dict[str, SyncJob] = {}
+        # Bumped on every state or progress change, so listeners can wait for updates
+        self._version = 0
+        self._changed = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="sync-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, trigger: str = "manual") -> Tuple[SyncJob, bool]:
+        """Queue a sync. Returns the job and whether a new one was created."""
+        with self._condition:
+            if self._pending:
+                job = self._pending[0]
+                job.coalesced_triggers += 1
+                logger.info(f"Sync trigger ({trigger}) coalesced into queued job {job.id}")
+                return job, False
+            job = SyncJob(trigger)
+            job._on_change = self._notify_change
+            self._pending.append(job)
+            self._jobs[job.id] = job
+            self._condition.notify()
+        logger.info(f"Queued sync job {job.id} ({trigger})")
+        self._notify_change()
+        return job, True
+
+    def cancel(self, job_id: str) -> Optional[SyncJob]:
+        """Cancel a queued job right away, or ask a running job to stop."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ("queued", "running"):
+                return job
+            job._cancel_event.set()
+            if job in self._pending:
+                self._pending.remove(job)
+                self._finish(job, "cancelled")
+        logger.info(f"Cancellation requested for sync job {job_id}")
+        self._notify_change()
+        return job
+
+    def get(self, job_id: str) -> Optional[SyncJob]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    @property
+    def running(self) -> Optional[SyncJob]:
+        return self._running
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._condition:
+            running, pending, finished = self._running, list(self._pending), list(self._finished)
+        return {
+            "running": running.to_dict() if running else None,
+            "queued": [job.to_dict() for job in pending],
+            "recent": [job.to_dict() for job in reversed(finished)]
+        }
+
+    def _notify_change(self):
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Block until the state moves past version or timeout expires. Returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout=timeout)
+            return self._version
+
+    def _finish(self, job: SyncJob, status: str):
+        job.status = status
+        job.finished_at = datetime.now().isoformat()
+        self._finished.append(job)
+        # Keep the lookup table bounded to jobs that are still reachable
+        reachable = {j.id for j in self._finished} | {j.id for j in self._pending}
+        if self._running:
+            reachable.add(self._running.id)
+        self._jobs = {job_id: j for job_id, j in self._jobs.items() if job_id in reachable}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                job = self._pending.popleft()
+                self._running = job
+                job.status = "running"
+                job.started_at = datetime.now().isoformat()
+            self._notify_change()
+
+            status = "completed"
+            try:
+                job.result = self._target(job)
+                # A sync that caught its own error still returns its partial stats
+                if isinstance(job.result, dict) and job.result.get("error"):
+                    job.error = job.result["error"]
+                    status = "failed"
+            except SyncCancelled:
+                status = "cancelled"
+            except Exception as e:
+                job.error = str(e)
+                status = "failed"
+                logger.error(f"Sync job {job.id} failed: {e}", exc_info=True)
+
+            with self._condition:
+                self._running = None
+                self._finish(job, status)
+            self._notify_change()
+            logger.info(f"Sync job {job.id} {status}")
@@ -1,72 +1,169 @@
 # main.py
-import schedule
 import time
 import json
 import os
-from threading import Thread
-from datetime import datetime
-from flask import Flask, request, jsonify
+import threading
+from typing import Optional
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from config import CONFIG, logger, save_config
-from carddav_sync import sync_contacts
-from notifications import send_email
+from config import CONFIG, config_store, logger
+from contact_cache import ContactCache
+from history import HistoryStore
+from scheduler import parse_schedule
+from tenants import get_tenants, tenant_config
+from worker_ipc import WorkerClient, WorkerUnavailable
 
 app = Flask(__name__)
 CORS(app)
 
-# Path for saving sync status
-SYNC_STATUS_FILE = '/app/data/sync_state.json'
+# Syncs run in the separate worker process (worker.py), so they never slow down API requests
+worker = WorkerClient()
 
-# Global variable to store the last sync status
-last_sync_status = {"status": "Not started", "last_run": None, "details": None}
+@app.errorhandler(WorkerUnavailable)
+def worker_unavailable(e):
+    logger.error(str(e))
+    return jsonify({"message": str(e)}), 503
 
-def save_sync_status():
-    os.makedirs(os.path.dirname(SYNC_STATUS_FILE), exist_ok=True)
-    with open(SYNC_STATUS_FILE, 'w') as f:
-        json.dump(last_sync_status, f)
+@app.route('/sync', methods=['POST'])
+def trigger_sync():
+    logger.info("Manual sync triggered")
+    result = worker.call("submit", trigger="manual")
+    message = "Synchronization queued" if result["created"] else "Synchronization already queued"
+    return jsonify({"message": message, "job": result["job"]}), 202
 
-def load_sync_status():
-    global last_sync_status
-    if os.path.exists(SYNC_STATUS_FILE):
-        with open(SYNC_STATUS_FILE, 'r') as f:
-            last_sync_status = json.load(f)
+# Minimum seconds between two progress events, and between keep-alive comments
+EVENT_INTERVAL = 0.5
+EVENT_HEARTBEAT = 15
+# Streams end after this many seconds and the browser reconnects, so no thread is held forever
+EVENT_STREAM_SECONDS = 300
+EVENT_RECONNECT_SECONDS = 3
+# Each stream occupies a server thread, so at most half of them serve streams and the rest stay
+# free for other requests. The limit applies per API worker process.
+EVENT_MAX_CLIENTS = int(os.environ.get("API_EVENT_CLIENTS", max(1, int(os.environ.get("API_THREADS", 8)) // 2)))
+_event_slots = threading.BoundedSemaphore(EVENT_MAX_CLIENTS)
 
-def run_sync():
-    global last_sync_status
-    try:
-        logger.info("Starting synchronization")
-        last_sync_status["status"] = "In progress"
-        last_sync_status["details"] = "Synchronization in progress"
-        last_sync_status["last_run"] = datetime.now().isoformat()
-        save_sync_status()
-        sync_contacts()
-        last_sync_status["status"] = "Completed"
-        last_sync_status["details"] = "Synchronization completed successfully"
-        logger.info("Synchronization completed successfully")
-    except Exception as e:
-        last_sync_status["status"] = "Failed"
-        last_sync_status["details"] = str(e)
-        logger.error(f"Synchronization failed: {e}", exc_info=True)
-        send_email("Synchronization Failed", f"Synchronization failed with error: {e}")
-    finally:
-        save_sync_status()
+@app.route('/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of sync progress and status for the dashboard."""
+    if not _event_slots.acquire(blocking=False):
+        logger.warning(f"Rejecting event stream, {EVENT_MAX_CLIENTS} streams are already open")
+        return (jsonify({"message": "Too many open event streams, try again later"}), 503,
+                {"Retry-After": str(EVENT_HEARTBEAT)})
 
-def run_scheduled_sync():
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    def generate():
+        version = -1
+        deadline = time.monotonic() + EVENT_STREAM_SECONDS
+        yield f"retry: {EVENT_RECONNECT_SECONDS * 1000}\n\n"
+        while time.monotonic() < deadline:
+            try:
+                update = worker.call("wait_for_change", timeout=EVENT_HEARTBEAT, version=version)
+            except WorkerUnavailable:
+                yield ": sync worker unavailable\n\n"
+                time.sleep(EVENT_HEARTBEAT)
+                continue
+            if update["version"] == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = update["version"]
+            payload = {"status": update["status"], "jobs": update["jobs"]}
+            yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+            time.sleep(EVENT_INTERVAL)
 
-@app.route('/sync', methods=['POST'])
-def trigger_sync():
-    logger.info("Manual sync triggered")
-    thread = Thread(target=run_sync)
-    thread.start()
-    return jsonify({"message": "Synchronization started"}), 202
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Called by the server when the stream ends or the client goes away, even before it started
+    response.call_on_close(_event_slots.release)
+    return response
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify(worker.call("jobs"))
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def manage_job(job_id):
+    job = worker.call("get_job" if request.method == 'GET' else "cancel_job", job_id=job_id)
+    if job is None:
+        return jsonify({"message": f"Job {job_id} not found"}), 404
+    return jsonify(job)
 
 @app.route('/status', methods=['GET'])
 def get_status():
     logger.debug("Status requested")
-    return jsonify(last_sync_status)
+    return jsonify(worker.call("status"))
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(worker.call("metrics"), mimetype='text/plain; version=0.0.4')
+
+# Largest page of runs returned by /history
+MAX_HISTORY_PAGE_SIZE = 100
+
+@app.route('/history', methods=['GET'])
+def list_history():
+    """Paginated sync runs, newest first, with percentiles and a daily trend over the last ?days."""
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(MAX_HISTORY_PAGE_SIZE, max(1, request.args.get('per_page', 20, type=int)))
+    days = max(1, request.args.get('days', 30, type=int))
+    status = request.args.get('status')
+    history = HistoryStore()
+    try:
+        runs, total = history.list_runs(page, per_page, status)
+        aggregate = history.aggregate(days)
+    finally:
+        history.close()
+    return jsonify({
+        "runs": runs,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": -(-total // per_page),
+        "aggregate": aggregate
+    })
+
+@app.route('/history/<run_id>', methods=['GET'])
+def get_history_run(run_id):
+    """A single run with phase timings, failed contacts and per-tenant details."""
+    history = HistoryStore()
+    try:
+        run = history.get_run(run_id)
+    finally:
+        history.close()
+    if run is None:
+        return jsonify({"message": f"Run {run_id} not found"}), 404
+    return jsonify(run)
+
+# Seconds a plan may take in the worker, enough for a refresh of a large address book
+PLAN_TIMEOUT = 600
+
+@app.route('/plan', methods=['GET'])
+def get_plan():
+    """Preview of the changes the next sync would make. ?refresh=1 fetches fresh CardDAV and MV data first."""
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+    if refresh and worker.call("running"):
+        return jsonify({"message": "A synchronization is running, try again when it has finished"}), 409
+    try:
+        # Planning parses the address book and may download both sides, so it runs in the worker
+        return jsonify(worker.call("plan", timeout=PLAN_TIMEOUT, refresh=refresh))
+    except WorkerUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to compute sync plan: {e}", exc_info=True)
+        return jsonify({"message": f"Failed to compute sync plan: {e}"}), 500
+
+@app.route('/contacts', methods=['GET'])
+def get_contact_counts():
+    logger.debug("Contact counts requested")
+    tenants = get_tenants()
+    if tenants:
+        return jsonify({tenant["NAME"]: contact_counts(tenant_config(tenant)["CONTACT_CACHE_FILE"]) for tenant in tenants})
+    return jsonify(contact_counts())
+
+def contact_counts(path: Optional[str] = None):
+    cache = ContactCache(path)
+    try:
+        return cache.counts()
+    finally:
+        cache.close()
 
 @app.route('/config', methods=['GET', 'POST'])
 def manage_config():
@@ -86,34 +183,34 @@ def manage_config():
     
     elif request.method == 'POST':
         logger.info("Updating configuration")
-        new_config = request.json
-        for key, value in new_config.items():
-            if key in configurable_fields:
-                CONFIG[key] = value
-                logger.info(f"Updated config: {key} = {value}")
-        
-        save_config(CONFIG)
-        
-        # If RUN_SCHEDULE has changed, update the schedule
-        if "RUN_SCHEDULE" in new_config:
-            schedule.clear()
-            if CONFIG["RUN_SCHEDULE"] == "daily":
-                schedule.every().day.at("04:00").do(run_sync)
-                logger.info("Updated sync schedule to daily at 04:00")
-        
+        changes = {key: value for key, value in request.json.items() if key in configurable_fields}
+        if "RUN_SCHEDULE" in changes:
+            try:
+                parse_schedule(changes["RUN_SCHEDULE"])
+            except ValueError as e:
+                return jsonify({"message": f"Invalid RUN_SCHEDULE: {e}"}), 400
+
+        snapshot = config_store.update(changes)
+        for key, value in changes.items():
+            logger.info(f"Updated config: {key} = {value}")
+        try:
+            # Syncs run in the worker, so its version number is the one jobs refer to
+            version = worker.call("reload_config")
+        except WorkerUnavailable as e:
+            logger.warning(f"Sync worker will pick up the configuration change later: {e}")
+            version = None
+
         return jsonify({
             "message": "Configuration updated",
-            "new_config": {field: CONFIG[field] for field in configurable_fields}
+            "version": version,
+            "new_config": {field: snapshot[field] for field in configurable_fields}
         }), 200
 
 if __name__ == "__main__":
-    load_sync_status()  # Load the last sync status when starting the app
+    # Development server. The sync worker runs inside this process instead of separately,
+    # in production the API is served by gunicorn (gunicorn.conf.py) and worker.py runs on its own.
+    import worker as sync_worker
+
     logger.info("Application started")
-    
-    if CONFIG["RUN_SCHEDULE"] == "daily":
-        schedule.every().day.at("04:00").do(run_sync)
-        sync_thread = Thread(target=run_scheduled_sync)
-        sync_thread.start()
-        logger.info("Scheduled daily sync at 04:00")
-    
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    sync_worker.start()
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
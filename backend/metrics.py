@@ -0,0 +1,215 @@
+# metrics.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from single HTTP calls up to whole sync phases
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    le = f'le="{_format_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_number(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+PHASE_SECONDS = Histogram(
+    "carddav_sync_phase_seconds",
+    "Duration of sync phases and individual CardDAV/MV operations.",
+    ["phase"])
+HTTP_REQUESTS = Counter(
+    "carddav_sync_http_requests_total",
+    "HTTP requests sent to the CardDAV and MV servers by status code.",
+    ["target", "method", "status"])
+HTTP_BYTES = Counter(
+    "carddav_sync_http_bytes_total",
+    "Bytes transferred to and from the CardDAV and MV servers, response bodies counted after decompression.",
+    ["target", "direction"])
+HTTP_RETRIES = Counter(
+    "carddav_sync_http_retries_total",
+    "HTTP requests retried after a transient failure, by status code or error.",
+    ["target", "reason"])
+SYNC_RUNS = Counter(
+    "carddav_sync_runs_total",
+    "Finished synchronization runs by outcome.",
+    ["status"])
+CONTACT_ACTIONS = Counter(
+    "carddav_sync_contacts_total",
+    "Contact cards handled by the sync, by action.",
+    ["action"])
+TENANT_RUNS = Counter(
+    "carddav_sync_tenant_runs_total",
+    "Finished tenant synchronization runs by tenant and outcome.",
+    ["tenant", "status"])
+TENANT_CONTACTS = Counter(
+    "carddav_sync_tenant_contacts_total",
+    "Contact cards handled by tenant synchronizations, by tenant and action.",
+    ["tenant", "action"])
+TENANT_SYNC_SECONDS = Histogram(
+    "carddav_sync_tenant_seconds",
+    "Duration of tenant synchronizations inside their worker process.",
+    ["tenant"])
+
+REGISTRY = [PHASE_SECONDS, HTTP_REQUESTS, HTTP_BYTES, HTTP_RETRIES, SYNC_RUNS, CONTACT_ACTIONS,
+            TENANT_RUNS, TENANT_CONTACTS, TENANT_SYNC_SECONDS]
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Per-run breakdown
+
+class RunBreakdown:
+    """Accumulates phase timings and HTTP totals for a single sync run."""
+
+    def __init__(self):
+        self._phases: Dict[str, List[float]] = {}
+        self._http: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            entry = self._phases.setdefault(phase, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def count_http(self, key: str, amount: int = 1):
+        with self._lock:
+            self._http[key] = self._http.get(key, 0) + amount
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            phases = {
+                phase: {"count": count, "total_seconds": round(total, 3), "avg_seconds": round(total / count, 4)}
+                for phase, (count, total) in self._phases.items()
+            }
+            return {"phases": phases, "http": dict(self._http)}
+
+_current_run: Optional[RunBreakdown] = None
+
+def start_run() -> RunBreakdown:
+    """Begin collecting the per-run breakdown reported in /status."""
+    global _current_run
+    _current_run = RunBreakdown()
+    return _current_run
+
+def observe(phase: str, seconds: float):
+    PHASE_SECONDS.observe(seconds, phase=phase)
+    run = _current_run
+    if run is not None:
+        run.observe(phase, seconds)
+
+@contextmanager
+def timer(phase: str):
+    """Time a block and record it under phase."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(phase, time.perf_counter() - start_time)
+
+def count_received_bytes(raw, add: Callable[[int], None]):
+    """Call add with the size of every body chunk read from a urllib3 response.
+
+    Bytes are counted as the client reads them, after content decoding, so chunked and
+    compressed responses are covered and bodies closed before the end count only what was read.
+    stream() goes through read() or read_chunked(), so wrapping those two sees every read once.
+    """
+    read, read_chunked = getattr(raw, 'read', None), getattr(raw, 'read_chunked', None)
+    if read is not None:
+        def counted_read(*args, **kwargs):
+            data = read(*args, **kwargs)
+            if data:
+                add(len(data))
+            return data
+        raw.read = counted_read
+    if read_chunked is not None:
+        def counted_read_chunked(*args, **kwargs):
+            for chunk in read_chunked(*args, **kwargs):
+                add(len(chunk))
+                yield chunk
+        raw.read_chunked = counted_read_chunked
+
+def instrument_session(session, target: str):
+    """Count status codes and bytes of every response received through a requests session."""
+    def record(response, *args, **kwargs):
+        method = response.request.method if response.request is not None else ""
+        HTTP_REQUESTS.inc(target=target, method=method, status=response.status_code)
+        body = response.request.body if response.request is not None else None
+        sent = len(body.encode('utf-8') if isinstance(body, str) else body or b"")
+        HTTP_BYTES.inc(sent, target=target, direction="sent")
+        run = _current_run
+
+        def received(amount: int):
+            HTTP_BYTES.inc(amount, target=target, direction="received")
+            if run is not None:
+                run.count_http(f"{target}_bytes_received", amount)
+
+        # The body is read after this hook returns, so received bytes are counted as they arrive
+        if response.raw is not None:
+            count_received_bytes(response.raw, received)
+        if run is not None:
+            run.count_http(f"{target}_{method}_{response.status_code}")
+            run.count_http(f"{target}_bytes_sent", sent)
+    session.hooks['response'].append(record)
+    return session
@@ -1,14 +1,32 @@
-from typing import List
+from typing import Iterable, Optional, Tuple
+
+def clean_value(value) -> Optional[str]:
+    """Normalize a raw export cell: None, NaN, 'nan' and blank strings become None."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    cleaned = str(value).strip()
+    if not cleaned or cleaned.lower() == "nan":
+        return None
+    return cleaned
 
 class UserDto:
-    def __init__(self, firstname: str, lastname: str, own_email: str, secondary_email: str, parent_email: str, groups: List[str]):
-        self.firstname = str(firstname)
-        self.lastname = str(lastname)
-        self.own_email = str(own_email)
-        self.secondary_email = str(secondary_email) if secondary_email else None
-        self.parent_email = str(parent_email) if parent_email else None
-        self.groups = groups
-
-    @property
-    def fullname(self) -> str:
-        return f"{self.firstname} {self.lastname}"
\ No newline at end of file
+    """An active MV member. Derived fields are computed once at construction."""
+
+    __slots__ = ('firstname', 'lastname', 'own_email', 'secondary_email', 'parent_email', 'groups',
+                 'fullname', 'parent_fullname', 'primary_email')
+
+    def __init__(self, firstname: str, lastname: str, own_email: str, secondary_email: str, parent_email: str, groups: Iterable[str]):
+        self.firstname: Optional[str] = clean_value(firstname)
+        self.lastname: Optional[str] = clean_value(lastname)
+        self.own_email: Optional[str] = clean_value(own_email)
+        self.secondary_email: Optional[str] = clean_value(secondary_email)
+        self.parent_email: Optional[str] = clean_value(parent_email)
+        self.groups: Tuple[str, ...] = tuple(group for group in map(clean_value, groups) if group)
+        self.fullname: str = " ".join(part for part in (self.firstname, self.lastname) if part)
+        self.parent_fullname: str = f"{self.fullname} (Eltern)"
+        self.primary_email: Optional[str] = self.own_email or self.secondary_email
+
+    def __repr__(self):
+        return f"UserDto({self.fullname!r})"
@@ -1,14 +1,78 @@
 # mv_integration.py
-import requests
-import pandas as pd
+import hashlib
+import io
+import json
 import os
-from typing import List
+import time
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional
 from config import CONFIG, logger
 from models import UserDto
+from http_client import create_session
+import metrics
+
+DEFAULT_SESSION_FILE = '/app/data/mv_session.json'
+DEFAULT_SNAPSHOT_FILE = '/app/data/mv_export_snapshot.json'
+# Bump when the conversion changes, so snapshots written by older versions are not reused
+SNAPSHOT_VERSION = 1
 
-def fetch_users_from_mv() -> List[UserDto]:
+def fetch_users_from_mv(stats: Optional[Dict] = None) -> List[UserDto]:
     logger.info("Fetching users from MV system")
-    auth_url = "https://mv.meinbdp.de/ica/rest/nami/auth/manual/sessionStartup"
+    base_url = CONFIG.get("MV_BASE_URL", "https://mv.meinbdp.de")
+    session = create_session("mv")
+
+    reused_session = load_session_cookies(session)
+    if not reused_session and not login(session, base_url):
+        return []
+
+    snapshot = load_export_snapshot()
+    get_response = download_export(session, base_url, snapshot)
+    if reused_session and session_expired(get_response):
+        logger.info("Stored MV session has expired, logging in again")
+        session.cookies.clear()
+        if not login(session, base_url):
+            return []
+        get_response = download_export(session, base_url, snapshot)
+
+    if get_response.status_code == 304 and snapshot:
+        save_session_cookies(session)
+        logger.info("MV export not modified since last run, using stored member snapshot")
+        if stats is not None:
+            stats["mv_export_unchanged"] = True
+        return users_from_snapshot(snapshot)
+
+    if get_response.status_code == 200 and not session_expired(get_response):
+        save_session_cookies(session)
+        content = get_response.content
+        logger.info(f"Data fetched successfully from MV system ({len(content)} bytes)")
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        if snapshot and snapshot.get("sha256") == content_hash:
+            logger.info("MV export unchanged since last run, using stored member snapshot")
+            if stats is not None:
+                stats["mv_export_unchanged"] = True
+            return users_from_snapshot(snapshot)
+
+        start_time = time.time()
+        users = convert_export_to_userdto(content)
+        parse_seconds = time.time() - start_time
+        metrics.observe("mv_export_parse", parse_seconds)
+        logger.info(f"Parsed MV export in {parse_seconds:.2f} seconds")
+        if stats is not None:
+            stats["mv_parse_seconds"] = round(parse_seconds, 3)
+            stats["mv_export_unchanged"] = False
+
+        save_export_snapshot(content_hash, get_response.headers.get('ETag'), users)
+        return users
+    else:
+        logger.error(f"GET request failed with status code: {get_response.status_code}")
+        logger.error(get_response.text)
+        return []
+
+def login(session, base_url: str) -> bool:
+    """Start a new MV session. The session cookie ends up in session.cookies."""
+    auth_url = f"{base_url}/ica/rest/nami/auth/manual/sessionStartup"
     auth_headers = {
         "Content-Type": "application/x-www-form-urlencoded",
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0",
@@ -21,80 +85,183 @@ def fetch_users_from_mv() -> List[UserDto]:
         "Login": "Anmelden"
     }
 
-    session = requests.Session()
-
-    auth_response = session.post(auth_url, headers=auth_headers, data=auth_data)
+    with metrics.timer("mv_login"):
+        auth_response = session.post(auth_url, headers=auth_headers, data=auth_data)
 
     if auth_response.status_code == 200:
         logger.info("Authentication successful!")
-    else:
-        logger.error(f"Authentication failed with status code: {auth_response.status_code}")
-        logger.error(auth_response.text)
-        return []
+        return True
+    logger.error(f"Authentication failed with status code: {auth_response.status_code}")
+    logger.error(auth_response.text)
+    return False
 
-    get_url = "https://mv.meinbdp.de/ica/rest/nami/search-multi/export-result-list"
+def download_export(session, base_url: str, snapshot: Optional[Dict]):
+    """Request the member export, conditionally if the previous download carried an ETag."""
+    get_url = f"{base_url}/ica/rest/nami/search-multi/export-result-list"
     params = {
         'searchedValues': '{"vorname":"","nachname":"","spitzname":"","mitgliedsNummber":"","mglWohnort":"","alterVon":"","alterBis":"","mglStatusId":null,"funktion":"","mglTypeId":[],"organisation":"","tagId":[],"bausteinIncludedId":[],"zeitschriftenversand":false,"searchName":"","taetigkeitId":[],"untergliederungId":[],"mitAllenTaetigkeiten":false,"withEndedTaetigkeiten":false,"ebeneId":null,"grpNummer":"","grpName":"","gruppierung1Id":null,"gruppierung2Id":null,"gruppierung3Id":null,"gruppierung4Id":null,"gruppierung5Id":null,"gruppierung6Id":null,"inGrp":false,"unterhalbGrp":false,"privacy":"","searchType":"MITGLIEDER"}',
-        'reportType': 7
+        'reportType': CONFIG.get("MV_REPORT_TYPE", 7)
     }
+    headers = {'If-None-Match': snapshot["etag"]} if snapshot and snapshot.get("etag") else {}
 
-    get_response = session.get(get_url, params=params)
+    with metrics.timer("mv_export_download"):
+        return session.get(get_url, params=params, headers=headers)
 
-    if get_response.status_code == 200:
-        logger.info("Data fetched successfully from MV system")
-    
-        output_file = "/tmp/fetched_data.xlsx"
-    
-        with open(output_file, "wb") as file:
-            file.write(get_response.content)
-    
-        logger.info(f"Data saved to {output_file}")
+def session_expired(response) -> bool:
+    """An expired MV session is answered with 401/403 or the HTML login page instead of the export."""
+    if response.status_code in (401, 403):
+        return True
+    return response.status_code == 200 and 'text/html' in response.headers.get('Content-Type', '')
 
-        users = convert_excel_to_userdto(output_file)
+# Session and Snapshot Storage
 
-        try:
-            os.remove(output_file)
-            logger.info(f"Temporary file {output_file} has been deleted")
-        except OSError as e:
-            logger.error(f"Error deleting temporary file {output_file}: {e}")
+def _write_json(path: str, data, mode: int = 0o644):
+    """Write JSON through a temporary file, so a crash never leaves a truncated file behind."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
 
-        return users
-    else:
-        logger.error(f"GET request failed with status code: {get_response.status_code}")
-        logger.error(get_response.text)
-        return []
+def _read_json(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable file {path}: {str(e)}")
+        return None
+
+def load_session_cookies(session) -> bool:
+    """Restore the cookies of the previous MV session. Returns False if there is no usable session."""
+    stored = _read_json(CONFIG.get("MV_SESSION_FILE", DEFAULT_SESSION_FILE))
+    if not stored or stored.get("base_url") != CONFIG.get("MV_BASE_URL", "https://mv.meinbdp.de") \
+            or stored.get("username") != CONFIG["MV_USERNAME"]:
+        return False
+    now = time.time()
+    cookies = [cookie for cookie in stored.get("cookies", []) if not cookie.get("expires") or cookie["expires"] > now]
+    if not cookies:
+        return False
+    for cookie in cookies:
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""),
+                            path=cookie.get("path", "/"), expires=cookie.get("expires"),
+                            secure=cookie.get("secure", False))
+    logger.info("Reusing stored MV session")
+    return True
+
+def save_session_cookies(session):
+    """Keep the MV session cookies for the next run. The file is only readable by the owner."""
+    cookies = [
+        {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path,
+         "expires": cookie.expires, "secure": cookie.secure}
+        for cookie in session.cookies
+    ]
+    stored = {
+        "base_url": CONFIG.get("MV_BASE_URL", "https://mv.meinbdp.de"),
+        "username": CONFIG["MV_USERNAME"],
+        "cookies": cookies
+    }
+    try:
+        _write_json(CONFIG.get("MV_SESSION_FILE", DEFAULT_SESSION_FILE), stored, mode=0o600)
+    except OSError as e:
+        logger.error(f"Error saving MV session: {str(e)}")
+
+def load_export_snapshot() -> Optional[Dict]:
+    """The parsed member list of the last downloaded export, if it is still valid for this configuration."""
+    snapshot = _read_json(CONFIG.get("MV_SNAPSHOT_FILE", DEFAULT_SNAPSHOT_FILE))
+    if not snapshot or snapshot.get("version") != SNAPSHOT_VERSION \
+            or snapshot.get("reader") != CONFIG.get("MV_EXPORT_READER", "calamine"):
+        return None
+    return snapshot
+
+def save_export_snapshot(content_hash: str, etag: Optional[str], users: List[UserDto]):
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "reader": CONFIG.get("MV_EXPORT_READER", "calamine"),
+        "sha256": content_hash,
+        "etag": etag,
+        "users": [
+            [user.firstname, user.lastname, user.own_email, user.secondary_email, user.parent_email, list(user.groups)]
+            for user in users
+        ]
+    }
+    try:
+        _write_json(CONFIG.get("MV_SNAPSHOT_FILE", DEFAULT_SNAPSHOT_FILE), snapshot)
+    except OSError as e:
+        logger.error(f"Error saving MV export snapshot: {str(e)}")
+
+def users_from_snapshot(snapshot: Dict) -> List[UserDto]:
+    users = [UserDto(*fields) for fields in snapshot["users"]]
+    logger.info(f"Loaded {len(users)} users from MV export snapshot")
+    return users
+
+EMAIL_COLUMNS = ['eMail', 'eMail2', 'eMail_Eltern']
+USER_COLUMNS = ['Status', 'Vorname', 'Nachname', 'Kleingruppe'] + EMAIL_COLUMNS
 
-def convert_excel_to_userdto(file_path: str) -> List[UserDto]:
-    logger.info(f"Converting Excel file to UserDto objects: {file_path}")
-    df = pd.read_excel(file_path)
-
-    users = []
-    for _, row in df.iterrows():
-        status = row['Status']
-        if status.lower() != "aktiv":
-            continue
-        firstname = row['Vorname']
-        lastname = row['Nachname']
-        own_email = row['eMail']
-        secondary_email = row['eMail2']
-        parent_email = row['eMail_Eltern']
-
-        if pd.isna(own_email) and pd.isna(secondary_email) and pd.isna(parent_email):
-            continue
-        
-        groups = []
-        if pd.notna(row['Kleingruppe']):
-            groups.append(row['Kleingruppe'])
-
-        user = UserDto(
+# Export Readers
+
+def read_excel_openpyxl(content: bytes) -> pd.DataFrame:
+    return pd.read_excel(io.BytesIO(content), usecols=USER_COLUMNS, engine="openpyxl")
+
+def read_excel_calamine(content: bytes) -> pd.DataFrame:
+    try:
+        return pd.read_excel(io.BytesIO(content), usecols=USER_COLUMNS, engine="calamine")
+    except ImportError as e:
+        logger.warning(f"Calamine engine unavailable ({e}), falling back to openpyxl")
+        return read_excel_openpyxl(content)
+
+def read_csv_export(content: bytes) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(content), usecols=USER_COLUMNS, sep=CONFIG.get("MV_CSV_SEPARATOR", ";"),
+                       encoding=CONFIG.get("MV_CSV_ENCODING", "utf-8"))
+
+EXPORT_READERS: Dict[str, Callable[[bytes], pd.DataFrame]] = {
+    "openpyxl": read_excel_openpyxl,
+    "calamine": read_excel_calamine,
+    "csv": read_csv_export,
+}
+
+def convert_export_to_userdto(content: bytes) -> List[UserDto]:
+    """Parse an MV export held in memory with the configured reader."""
+    reader_name = CONFIG.get("MV_EXPORT_READER", "calamine")
+    reader = EXPORT_READERS.get(reader_name)
+    if reader is None:
+        logger.warning(f"Unknown MV_EXPORT_READER '{reader_name}', using openpyxl")
+        reader = read_excel_openpyxl
+
+    logger.info(f"Converting MV export to UserDto objects using {reader_name}")
+    users = convert_dataframe_to_userdto(reader(content))
+    logger.info(f"Converted {len(users)} users from MV export")
+    return users
+
+def convert_dataframe_to_userdto(df: pd.DataFrame) -> List[UserDto]:
+    """Build UserDto objects for active members with at least one email, using column operations."""
+    df = df[df['Status'].astype(str).str.strip().str.lower() == "aktiv"]
+
+    # Strip emails in bulk and treat blank cells like missing ones
+    emails = df[EMAIL_COLUMNS].astype(object)
+    emails = emails.where(emails.isna(), emails.astype(str).apply(lambda column: column.str.strip()))
+    emails = emails.replace("", np.nan)
+    has_email = emails.notna().any(axis=1)
+    df = df[has_email]
+    emails = emails[has_email]
+
+    groups = df['Kleingruppe'].tolist()
+    return [
+        UserDto(
             firstname=firstname,
             lastname=lastname,
             own_email=own_email,
             secondary_email=secondary_email,
             parent_email=parent_email,
-            groups=groups
+            groups=[group] if pd.notna(group) else []
         )
-        users.append(user)
-
-    logger.info(f"Converted {len(users)} users from Excel file")
-    return users
\ No newline at end of file
+        for firstname, lastname, own_email, secondary_email, parent_email, group in zip(
+            df['Vorname'].tolist(),
+            df['Nachname'].tolist(),
+            emails['eMail'].tolist(),
+            emails['eMail2'].tolist(),
+            emails['eMail_Eltern'].tolist(),
+            groups
+        )
+    ]
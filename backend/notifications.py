@@ -1,21 +1,93 @@
+import queue
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import List, Tuple
 from config import CONFIG, logger
 
-def send_email(subject: str, body: str):
+# Messages waiting for the background sender, as lists of (subject, body) sent over one connection
+_outbox: "queue.Queue[List[Tuple[str, str]]]" = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+def _build_message(subject: str, body: str) -> MIMEMultipart:
     msg = MIMEMultipart()
     msg['From'] = CONFIG["SMTP_USERNAME"]
     msg['To'] = CONFIG["NOTIFICATION_EMAIL"]
     msg['Subject'] = subject
 
     msg.attach(MIMEText(body, 'plain'))
+    return msg
 
+def deliver(messages: List[Tuple[str, str]]):
+    """Send messages over a single SMTP connection."""
     try:
         with smtplib.SMTP(CONFIG["SMTP_SERVER"], CONFIG["SMTP_PORT"]) as server:
             server.starttls()
             server.login(CONFIG["SMTP_USERNAME"], CONFIG["SMTP_PASSWORD"])
-            server.send_message(msg)
-        logger.info(f"Email sent: {subject}")
+            for subject, body in messages:
+                server.send_message(_build_message(subject, body))
+                logger.info(f"Email sent: {subject}")
     except Exception as e:
-        logger.error(f"Failed to send email: {e}")
\ No newline at end of file
+        logger.error(f"Failed to send email: {e}")
+
+def _run_worker():
+    while True:
+        messages = _outbox.get()
+        batches = 1
+        # Drain whatever else is queued so it shares the connection
+        while True:
+            try:
+                messages = messages + _outbox.get_nowait()
+                batches += 1
+            except queue.Empty:
+                break
+        try:
+            deliver(messages)
+        finally:
+            for _ in range(batches):
+                _outbox.task_done()
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="notification-sender", daemon=True)
+            _worker.start()
+
+def send_email(subject: str, body: str):
+    """Queue a single email for the background sender."""
+    _ensure_worker()
+    _outbox.put([(subject, body)])
+
+def flush():
+    """Block until every queued email has been handed to the SMTP server."""
+    _outbox.join()
+
+class NotificationDigest:
+    """Collects notifications during a sync and sends them as one email at the end."""
+
+    def __init__(self, subject: str):
+        self.subject = subject
+        self._events: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, subject: str, body: str):
+        with self._lock:
+            self._events.append((subject, body))
+
+    def __len__(self):
+        return len(self._events)
+
+    def send(self):
+        """Queue the digest for the background sender. Nothing is sent if no events were collected."""
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return
+        if len(events) == 1:
+            send_email(*events[0])
+            return
+        sections = [f"{subject}\n{'-' * len(subject)}\n{body}" for subject, body in events]
+        send_email(f"{self.subject} ({len(events)} notifications)", "\n\n".join(sections))
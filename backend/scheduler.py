@@ -0,0 +1,167 @@
+# scheduler.py
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set
+from config import logger
+
+# Named schedules accepted in RUN_SCHEDULE besides cron expressions
+SCHEDULE_ALIASES = {
+    "hourly": "0 * * * *",
+    "daily": "0 4 * * *",
+    "weekly": "0 4 * * 1",
+    "monthly": "0 4 1 * *",
+}
+# RUN_SCHEDULE values that disable scheduled syncs
+NO_SCHEDULE = ("", "single", "manual", "none")
+
+MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+# Cron Expressions
+
+def parse_field(field: str, low: int, high: int, names: Optional[List[str]] = None) -> Set[int]:
+    """Values matched by one cron field, e.g. "*/15", "1-5", "mon,wed" or "0-30/10"."""
+    values: Set[int] = set()
+    for part in field.lower().split(","):
+        part, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise ValueError(f"Invalid step in cron field '{field}'")
+        if part == "*":
+            start, end = low, high
+        else:
+            start_text, _, end_text = part.partition("-")
+            start = parse_value(start_text, names, field)
+            end = parse_value(end_text, names, field) if end_text else (high if step_text else start)
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron field '{field}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_value(text: str, names: Optional[List[str]], field: str) -> int:
+    if names and text in names:
+        return names.index(text) + (1 if len(names) == 12 else 0)
+    if not text.isdigit():
+        raise ValueError(f"Invalid value '{text}' in cron field '{field}'")
+    return int(text)
+
+class CronExpression:
+    """A standard five-field cron expression: minute, hour, day of month, month, day of week.
+
+    As in cron, a day matches if either the day of month or the day of week matches when
+    both are restricted. Day of week 0 and 7 are both Sunday.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' needs 5 fields, got {len(fields)}")
+        self.expression = expression
+        self.minutes = parse_field(fields[0], 0, 59)
+        self.hours = parse_field(fields[1], 0, 23)
+        self.days = parse_field(fields[2], 1, 31)
+        self.months = parse_field(fields[3], 1, 12, MONTH_NAMES)
+        self.weekdays = {day % 7 for day in parse_field(fields[4], 0, 7, DAY_NAMES)}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+        if self.next_after(datetime(2000, 1, 1)) is None:
+            raise ValueError(f"Cron expression '{expression}' never matches")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        # isoweekday() is 1 for Monday to 7 for Sunday, cron counts Sunday as 0
+        weekday_match = moment.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_after(self, moment: datetime) -> Optional[datetime]:
+        """First matching minute strictly after moment, or None if there is none within 5 years."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=5 * 366)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        return None
+
+def parse_schedule(value: Optional[str]) -> Optional[CronExpression]:
+    """The cron expression for a RUN_SCHEDULE value, or None if syncs are not scheduled.
+
+    Raises ValueError for values that are neither a known name nor a valid cron expression.
+    """
+    value = (value or "").strip()
+    if value.lower() in NO_SCHEDULE:
+        return None
+    return CronExpression(SCHEDULE_ALIASES.get(value.lower().lstrip("@"), value))
+
+# Scheduler
+
+class SyncScheduler:
+    """Submits scheduled syncs according to RUN_SCHEDULE on a single background thread.
+
+    apply() only rebuilds the schedule when the value actually changed, so unrelated
+    configuration changes leave the next run time untouched.
+    """
+
+    # Longest sleep between checks, so clock adjustments are noticed
+    MAX_SLEEP = 60
+
+    def __init__(self, submit: Callable[[str], object]):
+        self._submit = submit
+        self._condition = threading.Condition()
+        self._value: Optional[str] = None
+        self._applied = False
+        self._expression: Optional[CronExpression] = None
+        self._next_run: Optional[datetime] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def next_run(self) -> Optional[datetime]:
+        return self._next_run
+
+    def apply(self, value: Optional[str]) -> bool:
+        """Switch to the schedule value. Returns whether the schedule changed."""
+        with self._condition:
+            if self._applied and value == self._value:
+                return False
+            expression = parse_schedule(value)
+            self._value, self._expression, self._applied = value, expression, True
+            self._next_run = expression.next_after(datetime.now()) if expression else None
+            self._condition.notify()
+        if expression:
+            logger.info(f"Sync schedule set to '{value}' ({expression.expression}), next run at {self._next_run.isoformat()}")
+        else:
+            logger.info("Scheduled syncs disabled")
+        return True
+
+    def start(self, value: Optional[str]):
+        """Start the scheduler thread and apply value. Raises ValueError if value is invalid."""
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sync-scheduler", daemon=True)
+                self._thread.start()
+        self.apply(value)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                now = datetime.now()
+                if self._next_run is None or now < self._next_run:
+                    timeout = (self._next_run - now).total_seconds() if self._next_run else None
+                    self._condition.wait(min(timeout, self.MAX_SLEEP) if timeout is not None else None)
+                    continue
+                self._next_run = self._expression.next_after(now)
+            logger.info("Scheduled sync due")
+            try:
+                self._submit("schedule")
+            except Exception as e:
+                logger.error(f"Failed to queue scheduled sync: {e}", exc_info=True)
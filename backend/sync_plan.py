@@ -0,0 +1,128 @@
+# sync_plan.py
+from datetime import datetime
+from typing import Dict, List, Tuple
+from config import CONFIG, ConfigSnapshot, config_store, logger
+from contact_cache import ContactCache
+from carddav_sync import (DANGLING_DELETE_AFTER, build_contact_index, card_state, card_state_hash,
+                          connect_to_carddav, dangling_key, desired_card_state, fetch_contacts)
+from mv_integration import fetch_users_from_mv, load_export_snapshot, users_from_snapshot
+from models import UserDto
+from tenants import get_tenants, mv_account_config, tenant_config
+
+# Names of the managed fields in a normalized card state, in order
+STATE_FIELDS = ("fn", "name", "email", "categories", "note")
+SUMMARY_FIELDS = ("create", "update", "unchanged", "invalid", "dangling_pending", "dangling_due")
+
+def load_mv_users(refresh: bool) -> List[UserDto]:
+    """MV members for the plan: the stored export snapshot unless a refresh is requested."""
+    if not refresh:
+        snapshot = load_export_snapshot()
+        if snapshot:
+            return users_from_snapshot(snapshot)
+        logger.info("No MV export snapshot stored, downloading the export for the plan")
+    return fetch_users_from_mv()
+
+def diff_states(current: Tuple, desired: Tuple) -> Dict[str, Dict]:
+    """Field-level difference between two normalized card states."""
+    return {
+        field: {"current": current_value, "planned": desired_value}
+        for field, current_value, desired_value in zip(STATE_FIELDS, current, desired)
+        if current_value != desired_value
+    }
+
+def plan_sync(refresh: bool = False) -> Dict:
+    """Compute what a sync would change, without writing anything to the CardDAV server.
+
+    By default the plan is built from the cached address book and the stored MV snapshot,
+    which makes it cheap. With refresh, both are brought up to date first. With TENANTS,
+    there is one plan per tenant under "tenants" and the summary adds them up.
+    """
+    tenants = get_tenants()
+    if not tenants:
+        return plan_contacts(refresh)
+
+    plans: Dict[str, Dict] = {}
+    for tenant in tenants:
+        # The tenant's own cache and dangling state, and the MV snapshot of its account
+        config = ConfigSnapshot(CONFIG.version, mv_account_config(tenant_config(tenant)))
+        with config_store.pinned(config):
+            try:
+                plans[tenant["NAME"]] = plan_contacts(refresh)
+            except Exception as e:
+                logger.error(f"Failed to compute sync plan for tenant {tenant['NAME']}: {e}", exc_info=True)
+                plans[tenant["NAME"]] = {"error": str(e)}
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "refreshed": refresh,
+        "summary": {field: sum(plan["summary"][field] for plan in plans.values() if "summary" in plan)
+                    for field in SUMMARY_FIELDS},
+        "tenants": plans
+    }
+
+def plan_contacts(refresh: bool) -> Dict:
+    """The plan for the configuration in effect, i.e. the single address book or one tenant's."""
+    logger.info(f"Computing sync plan ({'fresh' if refresh else 'cached'} data)")
+    cache = ContactCache()
+    try:
+        if refresh:
+            fetch_contacts(connect_to_carddav(), cache)
+        index = build_contact_index(cache, read_only=True)
+        mv_users = load_mv_users(refresh)
+        if not mv_users:
+            raise Exception("MV export could not be downloaded or was empty")
+
+        # Later members sharing a name overwrite earlier ones, like they do during a sync
+        planned: Dict[str, Tuple[UserDto, bool]] = {}
+        for user in mv_users:
+            planned[user.fullname] = (user, False)
+            if user.parent_email:
+                planned[user.parent_fullname] = (user, True)
+
+        index.collect_orphans(set(planned))
+        creates, updates, invalid = [], [], []
+        unchanged = 0
+        for name, (user, is_parent) in planned.items():
+            try:
+                desired = desired_card_state(user, is_parent)
+            except ValueError as e:
+                invalid.append({"name": name, "parent": is_parent, "error": str(e)})
+                continue
+            entry = index.find_by_fn(name) or index.claim_orphan(desired[2])
+            if entry is None:
+                creates.append({"name": name, "parent": is_parent, "fields": dict(zip(STATE_FIELDS, desired))})
+            elif entry.state_hash == card_state_hash(desired):
+                unchanged += 1
+            else:
+                updates.append({"name": name, "parent": is_parent, "href": entry.href,
+                                "changes": diff_states(card_state(entry.vcard), desired)})
+
+        dangling_state = cache.dangling()
+        today = datetime.now().strftime("%Y-%m-%d")
+        pending, due = [], []
+        for entry in index.entries:
+            if not entry.fn or not entry.managed or entry.fn in planned or entry.href in index.claimed:
+                continue
+            previous = dangling_state.get(dangling_key(entry))
+            count = previous["count"] + 1 if previous else 1
+            item = {"name": entry.fn, "href": entry.href, "first_seen": previous["first_seen"] if previous else today,
+                    "count": count, "runs_until_deletion": max(0, DANGLING_DELETE_AFTER - count)}
+            (due if count >= DANGLING_DELETE_AFTER else pending).append(item)
+    finally:
+        cache.close()
+
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "refreshed": refresh,
+        "summary": {
+            "create": len(creates),
+            "update": len(updates),
+            "unchanged": unchanged,
+            "invalid": len(invalid),
+            "dangling_pending": len(pending),
+            "dangling_due": len(due)
+        },
+        "creates": creates,
+        "updates": updates,
+        "invalid": invalid,
+        "dangling": {"pending": pending, "due": due}
+    }
@@ -0,0 +1,166 @@
+# tenants.py
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from config import CONFIG, LOG_DIR, config_store, logger, set_log_file
+from jobs import SyncCancelled, SyncJob
+from models import UserDto
+import metrics
+
+DEFAULT_TENANT_DATA_DIR = '/app/data/tenants'
+# State kept per tenant, placed in the tenant's data directory unless the tenant sets it explicitly
+TENANT_FILES = {
+    "CONTACT_CACHE_FILE": "contacts_cache.db",
+    "STATE_FILE": "dangling_contacts_state.json",
+}
+# State kept per MV account and shared by every tenant using that account
+MV_ACCOUNT_FILES = {
+    "MV_SESSION_FILE": "mv_session.json",
+    "MV_SNAPSHOT_FILE": "mv_export_snapshot.json",
+}
+# Settings that select the MV export, so tenants agreeing on all of them share one download
+MV_ACCOUNT_FIELDS = ("MV_BASE_URL", "MV_USERNAME", "MV_REPORT_TYPE", "MV_EXPORT_READER")
+STAT_FIELDS = ("created", "updated", "unchanged", "failed")
+
+def get_tenants() -> List[Dict]:
+    """Tenants from the TENANTS setting. Without any, the connector runs a single sync."""
+    return CONFIG.get("TENANTS") or []
+
+def tenant_data_dir(*parts: str) -> str:
+    return os.path.join(CONFIG.get("TENANT_DATA_DIR", DEFAULT_TENANT_DATA_DIR), *parts)
+
+def tenant_config(tenant: Dict) -> Dict:
+    """The complete configuration of a tenant: global settings overridden by the tenant's own."""
+    name = tenant["NAME"]
+    config = {key: value for key, value in CONFIG.items() if key != "TENANTS"}
+    config.update({key: value for key, value in tenant.items() if key != "NAME"})
+    config["TENANT_NAME"] = name
+    for key, filename in TENANT_FILES.items():
+        if key not in tenant:
+            config[key] = tenant_data_dir(name, filename)
+    return config
+
+def mv_account_key(config: Dict) -> str:
+    values = "\n".join(str(config.get(field)) for field in MV_ACCOUNT_FIELDS)
+    return hashlib.sha1(values.encode('utf-8')).hexdigest()[:12]
+
+def mv_account_config(config: Dict) -> Dict:
+    """Configuration for downloading the MV export of config's account, with shared session and snapshot files."""
+    account_config = dict(config)
+    for key, filename in MV_ACCOUNT_FILES.items():
+        account_config[key] = tenant_data_dir("mv", mv_account_key(config), filename)
+    return account_config
+
+# Worker Process Entry Points
+
+def _apply_config(config: Dict, log_name: str):
+    """Switch this worker process to config. Each process has its own CONFIG, so tenants cannot interfere."""
+    config_store.replace(config)
+    set_log_file(os.path.join(LOG_DIR, "tenants", f"{log_name}.log"))
+
+def fetch_account_members(config: Dict) -> Tuple[List[UserDto], Dict]:
+    from mv_integration import fetch_users_from_mv
+
+    _apply_config(config, f"mv-{mv_account_key(config)}")
+    stats = {}
+    users = fetch_users_from_mv(stats)
+    return users, stats
+
+def run_tenant_sync(config: Dict, mv_users: List[UserDto]) -> Dict:
+    from carddav_sync import sync_contacts
+    import notifications
+
+    _apply_config(config, config["TENANT_NAME"])
+    start_time = time.perf_counter()
+    try:
+        stats = sync_contacts(mv_users=mv_users)
+    finally:
+        # The process may be reused or shut down next, so the tenant's digest is sent now
+        notifications.flush()
+    stats["seconds"] = round(time.perf_counter() - start_time, 3)
+    return stats
+
+# Scheduler
+
+def sync_tenants(job: Optional[SyncJob] = None) -> Dict:
+    """Sync every tenant in a process pool.
+
+    MV exports are downloaded once per MV account first, then the tenant syncs run in
+    parallel, up to TENANT_CONCURRENCY at a time. A failing tenant does not stop the others.
+    """
+    configs = [tenant_config(tenant) for tenant in get_tenants()]
+    accounts: Dict[str, Dict] = {}
+    for config in configs:
+        accounts.setdefault(mv_account_key(config), mv_account_config(config))
+    workers = min(len(configs), max(1, int(CONFIG.get("TENANT_CONCURRENCY", 2))))
+    logger.info(f"Syncing {len(configs)} tenants with {workers} worker processes, {len(accounts)} MV accounts")
+
+    stats = {field: 0 for field in STAT_FIELDS}
+    stats["tenants"] = {}
+
+    def report(**fields):
+        if job:
+            job.update_progress(**fields)
+
+    # Worker processes are spawned rather than forked, as the API process runs several threads
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        report(phase="fetching_members", processed=0, total=len(configs))
+        members: Dict[str, List[UserDto]] = {}
+        account_futures = {pool.submit(fetch_account_members, config): key for key, config in accounts.items()}
+        for future in as_completed(account_futures):
+            key = account_futures[future]
+            try:
+                members[key], _ = future.result()
+            except Exception as e:
+                logger.error(f"Fetching MV export for account {key} failed: {e}")
+
+        report(phase="syncing_tenants")
+        tenant_futures: Dict[Future, str] = {}
+        for config in configs:
+            name = config["TENANT_NAME"]
+            users = members.get(mv_account_key(config))
+            # An empty member list would mark every card as dangling, so it is treated as a failure
+            if not users:
+                record_tenant_result(stats, name, error="MV export could not be downloaded or was empty")
+                continue
+            tenant_futures[pool.submit(run_tenant_sync, config, users)] = name
+
+        for future in as_completed(tenant_futures):
+            name = tenant_futures[future]
+            try:
+                record_tenant_result(stats, name, future.result())
+            except Exception as e:
+                logger.error(f"Sync of tenant {name} failed: {e}")
+                record_tenant_result(stats, name, error=str(e))
+            if job:
+                job.advance("processed")
+                if job.cancel_requested:
+                    # Tenants already running finish their sync, queued ones are dropped
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise SyncCancelled(f"Job {job.id} was cancelled")
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    failed = [name for name, result in stats["tenants"].items() if result.get("error")]
+    if failed:
+        stats["error"] = f"{len(failed)} of {len(configs)} tenants failed: {', '.join(sorted(failed))}"
+    logger.info(f"Tenant synchronization completed: {stats['created']} created, {stats['updated']} updated, "
+                f"{stats['unchanged']} unchanged, {len(failed)} tenants failed")
+    return stats
+
+def record_tenant_result(stats: Dict, name: str, result: Optional[Dict] = None, error: Optional[str] = None):
+    """Add a tenant's outcome to the combined stats and the tenant metrics."""
+    result = dict(result or {})
+    if error:
+        result["error"] = error
+    for field in STAT_FIELDS:
+        stats[field] += result.get(field, 0)
+        metrics.TENANT_CONTACTS.inc(result.get(field, 0), tenant=name, action=field)
+    if "seconds" in result:
+        metrics.TENANT_SYNC_SECONDS.observe(result["seconds"], tenant=name)
+    metrics.TENANT_RUNS.inc(tenant=name, status="failed" if result.get("error") else "completed")
+    stats["tenants"][name] = result
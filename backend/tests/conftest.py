@@ -0,0 +1,12 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# config.py loads the configuration and opens the log file on import, so both are
+# pointed at the bundled defaults and a temporary directory before any backend import
+os.environ.setdefault("CONFIG_FILE", os.path.join(BACKEND_DIR, "config.json"))
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="carddav-tests-"))
+sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,32 @@
+# tests/test_carddav_fetch.py
+import pytest
+
+pytest.importorskip("requests")
+
+import carddav_fetch
+from contact_cache import ContactCache
+
+CARD = "BEGIN:VCARD\r\nVERSION:3.0\r\nFN:Anna Schmidt\r\nEND:VCARD\r\n"
+
+def test_incremental_fetch_skips_cards_cached_with_the_reported_etag(tmp_path, monkeypatch):
+    cache = ContactCache(str(tmp_path / "contacts_cache.db"))
+    cache.store("/dav/a.vcf", "etag-a", CARD)
+    cache.store("/dav/b.vcf", "etag-b-old", CARD)
+    cache.set_sync_token("token-1")
+    cache.commit()
+
+    changes = {"/dav/a.vcf": "etag-a", "/dav/b.vcf": "etag-b-new", "/dav/c.vcf": None}
+    monkeypatch.setattr(carddav_fetch, "fetch_changes", lambda session, token: ("token-2", changes, []))
+    requested = []
+
+    def fetch_multiget_batched(session, hrefs):
+        requested.extend(hrefs)
+        return [(href, f"etag-{href}", CARD) for href in hrefs]
+
+    monkeypatch.setattr(carddav_fetch, "fetch_multiget_batched", fetch_multiget_batched)
+    carddav_fetch.fetch_incremental(None, cache)
+
+    assert requested == ["/dav/b.vcf", "/dav/c.vcf"]
+    assert cache.get_sync_token() == "token-2"
+    assert cache.etags()["/dav/a.vcf"] == "etag-a"
+    cache.close()
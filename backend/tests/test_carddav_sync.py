@@ -0,0 +1,114 @@
+# tests/test_carddav_sync.py
+import pytest
+
+pytest.importorskip("vobject")
+pytest.importorskip("requests")
+pytest.importorskip("pandas")
+
+import carddav_sync
+import metrics
+from config import CONFIG, ConfigSnapshot, config_store
+from contact_cache import ContactCache
+from models import UserDto
+
+def make_user(parent_email="eltern@example.org") -> UserDto:
+    return UserDto("Anna", "Schmidt", "anna@example.org", None, parent_email, ["Sippe Adler"])
+
+def test_saved_parent_card_counts_when_member_card_fails(monkeypatch):
+    def sync_contact_card(session, index, user, is_parent):
+        if not is_parent:
+            raise Exception("No valid email found")
+        return "created"
+
+    monkeypatch.setattr(carddav_sync, "sync_contact_card", sync_contact_card)
+    actions, errors = carddav_sync.update_or_create_contact_card(None, None, make_user())
+    assert actions == ["created"]
+    assert errors == [("Anna Schmidt", "User contact: No valid email found")]
+
+def test_failed_parent_card_is_listed_under_its_own_name(monkeypatch):
+    def sync_contact_card(session, index, user, is_parent):
+        if is_parent:
+            raise Exception("412 Precondition Failed")
+        return "updated"
+
+    monkeypatch.setattr(carddav_sync, "sync_contact_card", sync_contact_card)
+    actions, errors = carddav_sync.update_or_create_contact_card(None, None, make_user())
+    assert actions == ["updated"]
+    assert errors == [("Anna Schmidt (Eltern)", "Parent contact: 412 Precondition Failed")]
+
+def test_member_without_parent_email_has_one_card(monkeypatch):
+    monkeypatch.setattr(carddav_sync, "sync_contact_card", lambda session, index, user, is_parent: "unchanged")
+    assert carddav_sync.update_or_create_contact_card(None, None, make_user(parent_email=None)) == (["unchanged"], [])
+
+class RecordingDigest:
+    def __init__(self):
+        self.events = []
+
+    def add(self, event: str, body: str):
+        self.events.append(event)
+
+def test_dry_run_keeps_dangling_cards_and_sends_no_deletion_notice(tmp_path):
+    settings = dict(CONFIG.items(), DRY_RUN=True, STATE_FILE=None)
+    with config_store.pinned(ConfigSnapshot(CONFIG.version, settings)):
+        cache = ContactCache(str(tmp_path / "contacts_cache.db"))
+        index = carddav_sync.ContactIndex()
+        index.add(carddav_sync.IndexedCard(cache, "/cards/old.vcf", "etag-1", "uid-old", "Former Member", [],
+                                           True, None))
+        digest = RecordingDigest()
+        for _ in range(carddav_sync.DANGLING_DELETE_AFTER + 2):
+            carddav_sync.check_dangling_contacts(None, cache, index, [make_user()], digest)
+
+        assert digest.events == ["Dangling Contact Found", "Dangling Contact Reminder",
+                                 "Dangling Contact Not Deleted (Dry Run)"]
+        assert cache.dangling()["uid-old"]["count"] == carddav_sync.DANGLING_DELETE_AFTER + 2
+        cache.close()
+
+def test_sync_fails_without_touching_cards_when_mv_returns_no_members(tmp_path, monkeypatch):
+    monkeypatch.setattr(carddav_sync, "connect_to_carddav", lambda: None)
+    monkeypatch.setattr(carddav_sync, "fetch_contacts", lambda session, cache: None)
+    monkeypatch.setattr(carddav_sync, "fetch_users_from_mv", lambda stats: [])
+
+    def check_dangling_contacts(*args):
+        raise AssertionError("dangling contacts must not be checked without MV members")
+
+    monkeypatch.setattr(carddav_sync, "check_dangling_contacts", check_dangling_contacts)
+    settings = dict(CONFIG.items(), CONTACT_CACHE_FILE=str(tmp_path / "contacts_cache.db"), NOTIFICATION_EMAIL="")
+    with config_store.pinned(ConfigSnapshot(CONFIG.version, settings)):
+        stats = carddav_sync.sync_contacts()
+    assert stats["error"] == "MV export could not be downloaded or was empty"
+    assert stats["created"] == stats["updated"] == stats["failed"] == 0
+
+def test_read_only_index_does_not_write_or_time_while_a_sync_holds_the_cache(tmp_path):
+    path = str(tmp_path / "contacts_cache.db")
+    sync_cache = ContactCache(path)
+    sync_cache.store("/cards/anna.vcf", "etag-1", "BEGIN:VCARD\r\nVERSION:3.0\r\nUID:uid-anna\r\n"
+                                                  "FN:Anna Schmidt\r\nEND:VCARD\r\n")
+    sync_cache.commit()
+    run = metrics.start_run()
+    plan_cache = ContactCache(path)
+    # The sync keeps its write transaction open while the plan indexes the same cache
+    with sync_cache.batch():
+        sync_cache.store("/cards/jan.vcf", "etag-2", "BEGIN:VCARD\r\nVERSION:3.0\r\nFN:Jan\r\nEND:VCARD\r\n")
+        index = carddav_sync.build_contact_index(plan_cache, read_only=True)
+    assert index.find_by_fn("Anna Schmidt").uid == "uid-anna"
+    assert [row['parsed'] for row in plan_cache.rows()] == [0, 0]
+    assert "vcard_parse" not in run.to_dict()["phases"]
+    plan_cache.close()
+    sync_cache.close()
+
+def test_saved_card_is_cached_with_its_new_etag(tmp_path):
+    cache = ContactCache(str(tmp_path / "contacts_cache.db"))
+    cache.store("/dav/anna.vcf", "etag-1", "BEGIN:VCARD\r\nFN:Anna\r\nEND:VCARD\r\n")
+    entry = carddav_sync.IndexedCard(cache, "/dav/anna.vcf", "etag-1", "uid-anna", "Anna", [], True, "old-hash")
+    written = "BEGIN:VCARD\r\nFN:Anna Schmidt\r\nEND:VCARD\r\n"
+
+    carddav_sync.remember_saved_card(cache, entry, ("/dav/anna.vcf", "etag-2"), written, "new-hash")
+    carddav_sync.remember_saved_card(cache, None, ("/dav/new.vcf", "etag-3"), written, "new-hash")
+    assert cache.etags() == {"/dav/anna.vcf": "etag-2", "/dav/new.vcf": "etag-3"}
+    assert entry.text == written
+    assert (entry.etag, entry.state_hash) == ("etag-2", "new-hash")
+
+    # Without an ETag the stored version is unknown, so the card is downloaded again
+    carddav_sync.remember_saved_card(cache, entry, ("/dav/anna.vcf", None), written, "new-hash")
+    assert "/dav/anna.vcf" not in cache.etags()
+    cache.close()
@@ -0,0 +1,43 @@
+# tests/test_config.py
+import json
+import shutil
+
+import pytest
+
+import config
+from config import ConfigStore, load_config
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    shutil.copy(config.CONFIG_FILE, path)
+    monkeypatch.setattr(config, "CONFIG_FILE", str(path))
+    return path
+
+def test_updates_from_separate_stores_do_not_undo_each_other(config_file):
+    # Two stores stand for two API worker processes with their own snapshot of the same file
+    first, second = ConfigStore(load_config()), ConfigStore(load_config())
+    first.update({"DEFAULT_GROUP": "Stamm"})
+    second.update({"DRY_RUN": True})
+
+    saved = json.loads(config_file.read_text())
+    assert saved["DEFAULT_GROUP"] == "Stamm"
+    assert saved["DRY_RUN"] is True
+    assert second.latest["DEFAULT_GROUP"] == "Stamm"
+
+def test_pinned_snapshot_is_kept_while_changes_are_published(config_file):
+    store = ConfigStore(load_config())
+    with store.pinned() as snapshot:
+        store.update({"DEFAULT_GROUP": "Neu"})
+        assert store.current() is snapshot
+        assert store.current()["DEFAULT_GROUP"] != "Neu"
+    assert store.current()["DEFAULT_GROUP"] == "Neu"
+    assert store.current().version == snapshot.version + 1
+
+def test_unchanged_values_are_not_written(config_file):
+    store = ConfigStore(load_config())
+    before = config_file.stat().st_mtime_ns
+    snapshot = store.update({"DRY_RUN": store.latest["DRY_RUN"]})
+    assert snapshot is store.latest
+    assert snapshot.version == 1
+    assert config_file.stat().st_mtime_ns == before
@@ -0,0 +1,44 @@
+# tests/test_events.py
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import main
+
+class FakeWorker:
+    def call(self, method, timeout=0, **params):
+        return {"version": 1, "status": {"status": "Completed"}, "jobs": {"running": None}}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "worker", FakeWorker())
+    monkeypatch.setattr(main, "EVENT_INTERVAL", 0)
+    monkeypatch.setattr(main, "_event_slots", threading.BoundedSemaphore(1))
+    return main.app.test_client()
+
+def test_streams_above_the_limit_are_rejected_until_one_closes(client):
+    first = client.get("/events", buffered=False)
+    assert first.status_code == 200
+    assert next(first.response) == b"retry: 3000\n\n"
+
+    rejected = client.get("/events")
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == str(main.EVENT_HEARTBEAT)
+
+    first.close()
+    second = client.get("/events", buffered=False)
+    assert second.status_code == 200
+    second.close()
+
+def test_stream_ends_after_its_lifetime(client, monkeypatch):
+    monkeypatch.setattr(main, "EVENT_STREAM_SECONDS", 0.2)
+    response = client.get("/events")
+    body = response.get_data(as_text=True)
+    assert body.startswith("retry: 3000\n\n")
+    assert "event: progress" in body
+    # The server closes the finished response, which frees the slot again
+    response.close()
+    assert main._event_slots.acquire(blocking=False)
@@ -0,0 +1,29 @@
+# tests/test_jobs.py
+from jobs import SyncJobRunner
+
+def run_job(target) -> dict:
+    runner = SyncJobRunner(target)
+    job, _ = runner.submit("manual")
+    version = 0
+    while runner.get(job.id).status in ("queued", "running"):
+        version = runner.wait_for_change(version, timeout=5)
+    return runner.get(job.id).to_dict()
+
+def test_sync_returning_stats_completes():
+    job = run_job(lambda job: {"created": 1, "updated": 0, "unchanged": 0, "failed": 0})
+    assert job["status"] == "completed"
+    assert job["error"] is None
+
+def test_sync_reporting_an_error_fails_the_job():
+    job = run_job(lambda job: {"created": 0, "updated": 0, "unchanged": 0, "failed": 0, "error": "MV unreachable"})
+    assert job["status"] == "failed"
+    assert job["error"] == "MV unreachable"
+    assert job["result"]["error"] == "MV unreachable"
+
+def test_sync_raising_fails_the_job():
+    def target(job):
+        raise RuntimeError("CardDAV unreachable")
+
+    job = run_job(target)
+    assert job["status"] == "failed"
+    assert job["error"] == "CardDAV unreachable"
@@ -0,0 +1,76 @@
+# tests/test_metrics.py
+import gzip
+import threading
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import metrics
+
+BODY = b"<d:multistatus xmlns:d='DAV:'>" + b"<d:response>K\xc3\xa4rtchen</d:response>" * 500 + b"</d:multistatus>"
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        if self.path == '/gzip':
+            body = gzip.compress(BODY)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/chunked':
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for start in range(0, len(BODY), 4096):
+                chunk = BODY[start:start + 4096]
+                self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header('Content-Length', str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+@pytest.fixture(scope="module")
+def server_url():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def received_bytes(target: str) -> float:
+    return metrics.HTTP_BYTES._values.get((target, "received"), 0)
+
+@pytest.mark.parametrize("path", ["/plain", "/gzip", "/chunked"])
+def test_received_bytes_counted_when_content_is_read(server_url, path):
+    target = f"test{path.replace('/', '_')}"
+    session = metrics.instrument_session(requests.Session(), target)
+    run = metrics.start_run()
+    assert session.get(server_url + path).content == BODY
+    assert received_bytes(target) == len(BODY)
+    assert run.to_dict()["http"][f"{target}_bytes_received"] == len(BODY)
+
+@pytest.mark.parametrize("path", ["/plain", "/gzip", "/chunked"])
+def test_received_bytes_counted_when_raw_body_is_streamed(server_url, path):
+    target = f"test_stream{path.replace('/', '_')}"
+    session = metrics.instrument_session(requests.Session(), target)
+    response = session.get(server_url + path, stream=True)
+    response.raw.decode_content = True
+    elements = [elem for _, elem in ET.iterparse(response.raw) if elem.tag == '{DAV:}response']
+    response.close()
+    assert len(elements) == 500
+    assert received_bytes(target) == len(BODY)
+
+def test_unread_body_is_not_counted(server_url):
+    session = metrics.instrument_session(requests.Session(), "test_unread")
+    session.get(server_url + "/plain", stream=True).close()
+    assert received_bytes("test_unread") == 0
@@ -0,0 +1,90 @@
+# tests/test_notifications.py
+import threading
+import time
+
+import pytest
+
+import notifications
+from notifications import NotificationDigest, flush, send_email
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records every connection and the messages sent over it."""
+
+    connections = []
+    # Cleared by a test to hold the first connection open while more mail is queued
+    release = threading.Event()
+    send_delay = 0.0
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.steps = []
+        self.subjects = []
+        FakeSMTP.connections.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.steps.append("quit")
+
+    def starttls(self):
+        self.steps.append("starttls")
+
+    def login(self, username, password):
+        self.steps.append("login")
+
+    def send_message(self, message):
+        FakeSMTP.release.wait(timeout=5)
+        time.sleep(FakeSMTP.send_delay)
+        self.subjects.append(message['Subject'])
+
+@pytest.fixture
+def smtp(monkeypatch):
+    FakeSMTP.connections = []
+    FakeSMTP.release = threading.Event()
+    FakeSMTP.release.set()
+    FakeSMTP.send_delay = 0.0
+    monkeypatch.setattr(notifications.smtplib, "SMTP", FakeSMTP)
+    yield FakeSMTP
+    FakeSMTP.release.set()
+    flush()
+
+def test_digest_and_queued_emails_share_one_connection(smtp):
+    # Keep the sender busy with a first email, so everything below is queued behind it
+    smtp.release.clear()
+    send_email("Warm-up", "first")
+    while not smtp.connections:
+        time.sleep(0.01)
+
+    digest = NotificationDigest("Contact Synchronization Report")
+    digest.add("Dangling Contact Detected", "Anna Schmidt")
+    digest.add("Dangling Contact Deleted", "Jörg Müller")
+    digest.send()
+    send_email("Synchronization Failed", "boom")
+    send_email("Another", "message")
+    smtp.release.set()
+    flush()
+
+    assert len(smtp.connections) == 2
+    first, second = smtp.connections
+    assert first.subjects == ["Warm-up"]
+    assert second.subjects == ["Contact Synchronization Report (2 notifications)", "Synchronization Failed", "Another"]
+    assert second.steps == ["starttls", "login", "quit"]
+
+def test_flush_blocks_until_delivered(smtp):
+    smtp.send_delay = 0.2
+    send_email("Slow", "one")
+    send_email("Slow", "two")
+    start_time = time.perf_counter()
+    flush()
+    assert time.perf_counter() - start_time >= 0.2
+    assert [subject for connection in smtp.connections for subject in connection.subjects] == ["Slow", "Slow"]
+
+def test_digest_with_single_event_is_sent_as_is(smtp):
+    digest = NotificationDigest("Report")
+    digest.send()
+    digest.add("Only Event", "body")
+    digest.send()
+    flush()
+    assert [connection.subjects for connection in smtp.connections] == [["Only Event"]]
+    assert len(digest) == 0
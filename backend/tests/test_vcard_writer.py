@@ -0,0 +1,148 @@
+# tests/test_vcard_writer.py
+"""The text-based vCard writer against the vobject code path it replaced."""
+import pytest
+
+vobject = pytest.importorskip("vobject")
+pytest.importorskip("requests")
+
+from carddav_sync import CONNECTOR_NOTE, card_state
+from vcard_writer import ManagedFields, render_new_card, split_properties, update_card
+
+UID = "3f2a9c1e-0b7d-4c55-9e1a-2d6f4b8c0a11"
+
+# (fn, family, given, email, categories)
+FIELD_CASES = [
+    ("Anna Schmidt", "Schmidt", "Anna", "anna@example.org", ["Sippen", "gesammter Stamm"]),
+    ("Jörg Müller-Lüdenscheidt", "Müller-Lüdenscheidt", "Jörg", "joerg@example.org", ["Runde Wölfe", "Runden"]),
+    ("Eltern von Ärger, Björn; Jr.", "Ärger, Björn", "Jr.;\\", "eltern@example.org", ["Eltern", "A,B", "C;D"]),
+    ("Ω" * 40, "ß" * 60, "ü" * 50, "long.address." + "x" * 80 + "@example.org",
+     [f"Gruppe {i} mit Überlänge" for i in range(12)]),
+    ("Zeilen\numbruch", "Back\\slash", "Tab\tbed", "a@b.c", []),
+]
+
+def vobject_new_card(uid: str, fn: str, family: str, given: str, email: str, categories) -> str:
+    """A new card built the way the sync built it with vobject."""
+    card = vobject.vCard()
+    card.add('uid').value = uid
+    apply_with_vobject(card, fn, family, given, email, categories)
+    return card.serialize()
+
+def apply_with_vobject(card, fn: str, family: str, given: str, email: str, categories):
+    for name, value in (('fn', fn), ('n', vobject.vcard.Name(family=family, given=given)), ('email', email)):
+        if name not in card.contents:
+            card.add(name).value = value
+        else:
+            getattr(card, name).value = value
+    card.contents.pop('categories', None)
+    card.add('categories').value = list(categories)
+    card.contents.pop('note', None)
+    card.add('note').value = CONNECTOR_NOTE
+
+def fields_for(fn, family, given, email, categories) -> ManagedFields:
+    return ManagedFields(fn, family, given, email, categories, CONNECTOR_NOTE)
+
+@pytest.mark.parametrize("case", FIELD_CASES)
+def test_new_card_matches_vobject_byte_for_byte(case):
+    assert render_new_card(UID, fields_for(*case)) == vobject_new_card(UID, *case)
+
+def test_long_lines_fold_at_75_bytes():
+    # Like vobject, lines are only folded from 75 characters on, but then at 75 UTF-8 bytes
+    text = render_new_card(UID, fields_for(*FIELD_CASES[3]))
+    folded = [line for line in split_properties(text) if "\r\n " in line]
+    assert [line.split(":", 1)[0] for line in folded] == ["CATEGORIES", "EMAIL", "N"]
+    for line in folded:
+        for chunk in line.split("\r\n"):
+            assert len(chunk.encode('utf-8')) <= 75
+
+EXISTING_CARDS = {
+    "grouped": (
+        "BEGIN:VCARD\r\n"
+        "VERSION:3.0\r\n"
+        "UID:existing-1\r\n"
+        "item1.EMAIL;TYPE=INTERNET,HOME:old@example.org\r\n"
+        "item1.X-ABLabel:Privat\r\n"
+        "FN:Alter Name\r\n"
+        "N:Name;Alter;;;\r\n"
+        "TEL;TYPE=CELL:+49 170 1234567\r\n"
+        "END:VCARD\r\n"
+    ),
+    "duplicates": (
+        "BEGIN:VCARD\r\n"
+        "VERSION:3.0\r\n"
+        "UID:existing-2\r\n"
+        "FN:Anna Schmidt\r\n"
+        "N:Schmidt;Anna;;;\r\n"
+        "EMAIL:anna@example.org\r\n"
+        "EMAIL:second@example.org\r\n"
+        "CATEGORIES:Alt\r\n"
+        "NOTE:first note\r\n"
+        "ADR;TYPE=HOME:;;Hauptstraße 1;Leer;;26789;Deutschland\r\n"
+        "CATEGORIES:Noch,Älter\r\n"
+        "NOTE:second note that is long enough to be folded by the server when it stores \r\n"
+        " the card\r\n"
+        "END:VCARD\r\n"
+    ),
+    "missing": (
+        "BEGIN:VCARD\r\n"
+        "VERSION:3.0\r\n"
+        "ORG:Pfadfinder\r\n"
+        "X-CUSTOM;X-PARAM=1:bleibt unverändert\r\n"
+        "END:VCARD\r\n"
+    ),
+}
+
+@pytest.mark.parametrize("name", sorted(EXISTING_CARDS))
+@pytest.mark.parametrize("case", FIELD_CASES)
+def test_updated_card_has_same_state_as_vobject(name, case):
+    original = EXISTING_CARDS[name]
+    text = update_card(original, fields_for(*case), UID)
+
+    reference = vobject.readOne(original)
+    if 'uid' not in reference.contents:
+        reference.add('uid').value = UID
+    apply_with_vobject(reference, *case)
+
+    # Both sides are compared as stored on the server, i.e. after serializing and parsing again
+    reference = vobject.readOne(reference.serialize())
+    updated = vobject.readOne(text)
+    assert card_state(updated) == card_state(reference)
+    assert updated.uid.value == reference.uid.value
+
+@pytest.mark.parametrize("name", sorted(EXISTING_CARDS))
+def test_update_keeps_unmanaged_lines_unchanged(name):
+    original = EXISTING_CARDS[name]
+    text = update_card(original, fields_for(*FIELD_CASES[1]), UID)
+    managed = ("FN", "N", "EMAIL", "CATEGORIES", "NOTE", "UID", "END")
+
+    def unmanaged(card_text):
+        lines = []
+        for line in split_properties(card_text):
+            name = line.split(":", 1)[0].split(";", 1)[0].rpartition(".")[2].upper()
+            if name not in managed:
+                lines.append(line)
+        return lines
+
+    kept = unmanaged(text)
+    # Extra EMAIL lines after the first one are unmanaged too and must survive
+    if name == "duplicates":
+        assert "EMAIL:second@example.org" in split_properties(text)
+    assert kept == unmanaged(original)
+    assert text.endswith("END:VCARD\r\n")
+
+def test_grouped_email_keeps_group_and_parameters():
+    text = update_card(EXISTING_CARDS["grouped"], fields_for(*FIELD_CASES[0]), UID)
+    assert "item1.EMAIL;TYPE=INTERNET,HOME:anna@example.org\r\n" in text
+    assert "UID:existing-1\r\n" in text
+
+def test_duplicate_categories_and_notes_collapse_into_one():
+    text = update_card(EXISTING_CARDS["duplicates"], fields_for(*FIELD_CASES[0]), UID)
+    names = [line.split(":", 1)[0] for line in split_properties(text)]
+    assert names.count("CATEGORIES") == 1
+    assert names.count("NOTE") == 1
+
+def test_missing_properties_are_added_with_uid():
+    text = update_card(EXISTING_CARDS["missing"], fields_for(*FIELD_CASES[0]), UID)
+    card = vobject.readOne(text)
+    assert card.uid.value == UID
+    assert card_state(card)[0] == "Anna Schmidt"
+    assert card.email.value == "anna@example.org"
@@ -0,0 +1,119 @@
+# vcard_writer.py
+from typing import Iterable, List, Tuple
+
+# Lines are folded once they reach this many characters, at this many UTF-8 bytes (as vobject does)
+LINE_LENGTH = 75
+
+# Property order of a new card, matching what vobject.serialize() produces for it
+NEW_CARD_TEMPLATE = (
+    "BEGIN:VCARD\r\n"
+    "VERSION:3.0\r\n"
+    "{uid}"
+    "{categories}"
+    "{email}"
+    "{fn}"
+    "{n}"
+    "{note}"
+    "END:VCARD\r\n"
+)
+
+def escape_text(value: str) -> str:
+    """Escape a vCard text value."""
+    value = value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return value.replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", "\\n")
+
+def fold_line(line: str) -> str:
+    """Fold a content line into CRLF-terminated chunks without splitting UTF-8 sequences."""
+    if len(line) < LINE_LENGTH:
+        return line + "\r\n"
+    parts = []
+    counter = 0
+    for char in line:
+        size = len(char.encode('utf-8'))
+        if counter + size > LINE_LENGTH:
+            parts.append("\r\n ")
+            counter = 1
+        parts.append(char)
+        counter += size
+    parts.append("\r\n")
+    return "".join(parts)
+
+def property_line(name: str, value: str, params: str = "") -> str:
+    return fold_line(f"{name}{params}:{value}")
+
+class ManagedFields:
+    """Escaped values of the properties the connector owns on a card."""
+
+    __slots__ = ('fn', 'n', 'email', 'categories', 'note')
+
+    def __init__(self, fn: str, family: str, given: str, email: str, categories: Iterable[str], note: str):
+        self.fn = escape_text(fn)
+        self.n = f"{escape_text(family)};{escape_text(given)};;;"
+        self.email = escape_text(email)
+        self.categories = ",".join(escape_text(category) for category in categories)
+        self.note = escape_text(note)
+
+def render_new_card(uid: str, fields: ManagedFields) -> str:
+    """Serialize a new card through the template."""
+    return NEW_CARD_TEMPLATE.format(
+        uid=property_line("UID", escape_text(uid)),
+        categories=property_line("CATEGORIES", fields.categories),
+        email=property_line("EMAIL", fields.email),
+        fn=property_line("FN", fields.fn),
+        n=property_line("N", fields.n),
+        note=property_line("NOTE", fields.note)
+    )
+
+def split_properties(text: str) -> List[str]:
+    """Split a card into its content lines, each kept in its original (folded) form."""
+    lines: List[str] = []
+    for physical_line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        if physical_line[:1] in (" ", "\t") and lines:
+            lines[-1] += "\r\n" + physical_line
+        elif physical_line:
+            lines.append(physical_line)
+    return lines
+
+def unfold(line: str) -> str:
+    return line.replace("\r\n ", "").replace("\r\n\t", "")
+
+def parse_name(line: str) -> Tuple[str, str, str]:
+    """Group prefix, upper-case property name and parameter part of a content line."""
+    head = unfold(line).split(":", 1)[0]
+    name, _, params = head.partition(";")
+    group, _, name = name.rpartition(".")
+    return f"{group}." if group else "", name.upper(), f";{params}" if params else ""
+
+# Replaced in place, keeping group and parameters, like assigning .value on the first vobject property
+REPLACED_PROPERTIES = ("FN", "N", "EMAIL")
+# Collapsed into a single new line, like removing all vobject properties and adding one
+COLLAPSED_PROPERTIES = ("CATEGORIES", "NOTE")
+
+def update_card(text: str, fields: ManagedFields, uid: str) -> str:
+    """Apply fields to an existing card given as text.
+
+    Lines of unmanaged properties are kept byte for byte and in their original order. Managed
+    properties the card lacks are added before END:VCARD, including uid if it has no UID.
+    """
+    output: List[str] = []
+    seen = set()
+    for line in split_properties(text):
+        group, name, params = parse_name(line)
+        if name == "END":
+            break
+        if name in REPLACED_PROPERTIES and name not in seen:
+            output.append(property_line(f"{group}{name}", getattr(fields, name.lower()), params))
+        elif name in COLLAPSED_PROPERTIES:
+            if name not in seen:
+                output.append(property_line(name, getattr(fields, name.lower())))
+        else:
+            output.append(line + "\r\n")
+        seen.add(name)
+
+    for name in REPLACED_PROPERTIES + COLLAPSED_PROPERTIES:
+        if name not in seen:
+            output.append(property_line(name, getattr(fields, name.lower())))
+    if "UID" not in seen:
+        output.append(property_line("UID", escape_text(uid)))
+    output.append("END:VCARD\r\n")
+    return "".join(output)
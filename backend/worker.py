@@ -0,0 +1,187 @@
+# worker.py
+"""Sync worker process: runs scheduled and requested syncs, separate from the API.
+
+Start it with `python worker.py`. The API talks to it over the Unix socket SYNC_WORKER_SOCKET.
+"""
+import json
+import os
+import threading
+from typing import Dict, Optional
+from datetime import datetime
+from config import CONFIG, config_store, logger, watch_config_file
+from carddav_sync import sync_contacts
+from history import HistoryStore
+from jobs import SyncCancelled, SyncJob, SyncJobRunner
+from metrics import render_prometheus
+from notifications import send_email
+from scheduler import SyncScheduler
+from sync_plan import plan_sync
+from tenants import get_tenants, sync_tenants
+import worker_ipc
+
+# Path for saving sync status
+SYNC_STATUS_FILE = CONFIG.get("SYNC_STATUS_FILE", '/app/data/sync_state.json')
+
+# Global variable to store the last sync status
+last_sync_status = {"status": "Not started", "last_run": None, "details": None}
+
+def save_sync_status():
+    os.makedirs(os.path.dirname(SYNC_STATUS_FILE), exist_ok=True)
+    with open(SYNC_STATUS_FILE, 'w') as f:
+        json.dump(last_sync_status, f)
+
+def load_sync_status():
+    global last_sync_status
+    if os.path.exists(SYNC_STATUS_FILE):
+        with open(SYNC_STATUS_FILE, 'r') as f:
+            last_sync_status = json.load(f)
+
+# Held by syncs and refreshed plans, the only writers of the contact caches
+cache_writer = threading.Lock()
+
+def run_sync(job: Optional[SyncJob] = None):
+    started_at = datetime.now()
+    stats = None
+    # The whole run reads one configuration version, even if the configuration changes meanwhile
+    with cache_writer, config_store.pinned(config_store.latest) as snapshot:
+        if job:
+            job.config_version = snapshot.version
+        try:
+            stats = _run_sync(job, snapshot.version)
+            return stats
+        finally:
+            record_run(job, started_at, stats, snapshot.version)
+
+def record_run(job: Optional[SyncJob], started_at: datetime, stats: Optional[dict], config_version: int):
+    """Append the finished run to the history. Failing to record it does not fail the sync."""
+    status = last_sync_status["status"].lower()
+    if stats is None and status == "failed":
+        stats = {"error": last_sync_status["details"]}
+    try:
+        history = HistoryStore()
+        try:
+            history.record(job.id if job else datetime.now().strftime("%Y%m%d%H%M%S"), job.trigger if job else None,
+                           status, started_at, datetime.now(), stats, config_version)
+        finally:
+            history.close()
+    except Exception as e:
+        logger.error(f"Failed to record sync run in history: {e}", exc_info=True)
+
+def _run_sync(job: Optional[SyncJob], config_version: int):
+    global last_sync_status
+    try:
+        logger.info(f"Starting synchronization with configuration version {config_version}")
+        last_sync_status["status"] = "In progress"
+        last_sync_status["details"] = "Synchronization in progress"
+        last_sync_status["last_run"] = datetime.now().isoformat()
+        last_sync_status["run_id"] = job.id if job else None
+        save_sync_status()
+        stats = sync_tenants(job) if get_tenants() else sync_contacts(job)
+        last_sync_status["stats"] = {key: value for key, value in stats.items() if key not in ("breakdown", "failed_contacts")}
+        last_sync_status["breakdown"] = stats.get("breakdown")
+        if stats.get("error"):
+            last_sync_status["status"] = "Failed"
+            last_sync_status["details"] = stats["error"]
+            logger.error(f"Synchronization failed: {stats['error']}")
+        else:
+            last_sync_status["status"] = "Completed"
+            last_sync_status["details"] = (f"Synchronization completed successfully: {stats['created']} created, "
+                                           f"{stats['updated']} updated, {stats['unchanged']} unchanged, "
+                                           f"{stats['failed']} failed")
+            logger.info("Synchronization completed successfully")
+        return stats
+    except SyncCancelled:
+        last_sync_status["status"] = "Cancelled"
+        last_sync_status["details"] = "Synchronization was cancelled"
+        logger.info("Synchronization cancelled")
+        raise
+    except Exception as e:
+        last_sync_status["status"] = "Failed"
+        last_sync_status["details"] = str(e)
+        logger.error(f"Synchronization failed: {e}", exc_info=True)
+        send_email("Synchronization Failed", f"Synchronization failed with error: {e}")
+        # The job runner marks the job as failed
+        raise
+    finally:
+        save_sync_status()
+
+# All syncs, manual or scheduled, go through one worker so runs never overlap
+sync_runner = SyncJobRunner(run_sync)
+
+scheduler = SyncScheduler(sync_runner.submit)
+
+def apply_config_change(old, new):
+    """Rebuild the schedule when RUN_SCHEDULE changed, whether through the API or in the file."""
+    if old.get("RUN_SCHEDULE") == new.get("RUN_SCHEDULE"):
+        return
+    try:
+        scheduler.apply(new.get("RUN_SCHEDULE"))
+    except ValueError as e:
+        logger.error(f"Keeping the previous sync schedule, RUN_SCHEDULE is invalid: {e}")
+
+config_store.subscribe(apply_config_change)
+
+# Calls Answered for the API
+
+def submit(trigger: str = "manual") -> Dict:
+    job, created = sync_runner.submit(trigger)
+    return {"job": job.to_dict(), "created": created}
+
+def get_job(job_id: str) -> Optional[Dict]:
+    job = sync_runner.get(job_id)
+    return job.to_dict() if job else None
+
+def cancel_job(job_id: str) -> Optional[Dict]:
+    job = sync_runner.cancel(job_id)
+    return job.to_dict() if job else None
+
+def wait_for_change(version: int, timeout: float) -> Dict:
+    """Block until the sync state moves past version, then return it with the current status and jobs."""
+    new_version = sync_runner.wait_for_change(version, timeout=timeout)
+    if new_version == version:
+        return {"version": version}
+    return {"version": new_version, "status": last_sync_status, "jobs": sync_runner.snapshot()}
+
+def plan(refresh: bool = False) -> Dict:
+    # A plain plan only reads the caches. A refresh writes them, so it never overlaps a sync.
+    if not refresh:
+        return plan_sync(refresh)
+    if not cache_writer.acquire(blocking=False):
+        raise RuntimeError("A synchronization is running, try again when it has finished")
+    try:
+        return plan_sync(refresh)
+    finally:
+        cache_writer.release()
+
+def reload_config() -> int:
+    """Apply a configuration the API just saved, without waiting for the file watcher."""
+    config_store.reload_if_changed()
+    return CONFIG.version
+
+HANDLERS = {
+    "submit": submit,
+    "jobs": sync_runner.snapshot,
+    "get_job": get_job,
+    "cancel_job": cancel_job,
+    "status": lambda: last_sync_status,
+    "running": lambda: sync_runner.running is not None,
+    "wait_for_change": wait_for_change,
+    "metrics": render_prometheus,
+    "plan": plan,
+    "reload_config": reload_config,
+}
+
+def start():
+    """Restore the last status, start the scheduler and config watcher, and listen for the API."""
+    load_sync_status()
+    try:
+        scheduler.start(CONFIG.get("RUN_SCHEDULE"))
+    except ValueError as e:
+        logger.error(f"Scheduled syncs disabled, RUN_SCHEDULE is invalid: {e}")
+    watch_config_file()
+    return worker_ipc.serve(HANDLERS)
+
+if __name__ == "__main__":
+    logger.info("Sync worker started")
+    start()
+    threading.Event().wait()
@@ -0,0 +1,110 @@
+# worker_ipc.py
+import json
+import os
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, Dict, Optional
+from config import CONFIG, logger
+
+DEFAULT_WORKER_SOCKET = '/app/data/sync_worker.sock'
+# Seconds a call may take beyond its own timeout before the worker counts as unresponsive
+CALL_TIMEOUT = 10
+
+class WorkerUnavailable(Exception):
+    """The sync worker process is not running or did not answer."""
+
+def worker_socket() -> str:
+    return CONFIG.get("SYNC_WORKER_SOCKET", DEFAULT_WORKER_SOCKET)
+
+# Messages are JSON documents, so nothing received over the socket is ever unpickled
+
+def _send(conn: Connection, message: Dict):
+    conn.send_bytes(json.dumps(message).encode('utf-8'))
+
+def _receive(conn: Connection) -> Dict:
+    return json.loads(conn.recv_bytes().decode('utf-8'))
+
+# Server
+
+def serve(handlers: Dict[str, Callable[..., object]], address: Optional[str] = None) -> Listener:
+    """Answer calls to handlers on a Unix socket, one thread per connection, in the background.
+
+    A request is {"method": name, "params": {...}}, the reply {"result": ...} or {"error": message}.
+    """
+    address = address or worker_socket()
+    os.makedirs(os.path.dirname(address), exist_ok=True)
+    if os.path.exists(address):
+        # Left behind by a worker that did not shut down cleanly
+        os.remove(address)
+    listener = Listener(address, family='AF_UNIX')
+    os.chmod(address, 0o660)
+
+    def handle(conn: Connection):
+        with conn:
+            while True:
+                try:
+                    request = _receive(conn)
+                except (EOFError, OSError):
+                    return
+                handler = handlers.get(request.get("method"))
+                try:
+                    if handler is None:
+                        raise ValueError(f"Unknown method {request.get('method')}")
+                    reply = {"result": handler(**request.get("params", {}))}
+                except Exception as e:
+                    logger.error(f"Worker call {request.get('method')} failed: {e}", exc_info=True)
+                    reply = {"error": str(e)}
+                try:
+                    _send(conn, reply)
+                except OSError:
+                    return
+
+    def accept():
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError as e:
+                logger.error(f"Worker socket stopped accepting connections: {e}")
+                return
+            threading.Thread(target=handle, args=(conn,), name="worker-ipc", daemon=True).start()
+
+    threading.Thread(target=accept, name="worker-ipc-listener", daemon=True).start()
+    logger.info(f"Sync worker listening on {address}")
+    return listener
+
+# Client
+
+class WorkerClient:
+    """Calls the sync worker. Each thread keeps its own connection, which is reopened after errors."""
+
+    def __init__(self, address: Optional[str] = None):
+        self._address = address
+        self._local = threading.local()
+
+    def _connection(self) -> Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self._address or worker_socket(), family='AF_UNIX')
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def call(self, method: str, timeout: float = 0, **params):
+        """Call method on the worker. timeout is how long the call itself is expected to block."""
+        try:
+            conn = self._connection()
+            _send(conn, {"method": method, "params": params})
+            if not conn.poll(timeout + CALL_TIMEOUT):
+                raise TimeoutError(f"no reply to {method} within {timeout + CALL_TIMEOUT}s")
+            reply = _receive(conn)
+        except (OSError, EOFError, TimeoutError) as e:
+            self._reset()
+            raise WorkerUnavailable(f"Sync worker is not reachable: {e}") from e
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
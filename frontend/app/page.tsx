@@ -6,7 +6,9 @@ import { Switch } from "@/components/ui/switch"
 import { Label } from "@/components/ui/label"
 import { Separator } from "@/components/ui/separator"
 import { RefreshCcw } from "lucide-react"
-import { StatusCard } from '@/components/StatusCard'
+import { StatusCard, SyncEvent, SyncProgress } from '@/components/StatusCard'
+import { PlanCard } from '@/components/PlanCard'
+import { HistoryCard } from '@/components/HistoryCard'
 import { GroupMappings } from '@/components/GroupMappings'
 import { ConfigSettings } from '@/components/ConfigSettings'
 import { Toast } from '@/components/Toast'
@@ -28,8 +30,9 @@ interface GroupMapping {
 }
 
 export default function Home() {
-  const [autoRefresh, setAutoRefresh] = useState(false)
+  const [liveUpdates, setLiveUpdates] = useState(true)
   const [status, setStatus] = useState<StatusDetails | null>(null)
+  const [progress, setProgress] = useState<SyncProgress | null>(null)
   const [config, setConfig] = useState<Record<string, any> | null>(null)
   const [groupMappings, setGroupMappings] = useState<GroupMapping[]>([])
   const [loading, setLoading] = useState(true)
@@ -52,6 +55,11 @@ export default function Home() {
     }
   }, [showToast])
 
+  const handleSyncEvent = useCallback((event: SyncEvent) => {
+    setStatus(event.status as StatusDetails)
+    setProgress(event.jobs.running ? event.jobs.running.progress : null)
+  }, [])
+
   const fetchConfig = useCallback(async () => {
     try {
       const response = await fetch(`${API_BASE_URL}/config`)
@@ -156,27 +164,46 @@ export default function Home() {
                 <CardTitle className="text-2xl font-bold"></CardTitle>
                 <div className="flex items-center space-x-2">
                   <Switch
-                    id="auto-refresh"
-                    checked={autoRefresh}
-                    onCheckedChange={setAutoRefresh}
+                    id="live-updates"
+                    checked={liveUpdates}
+                    onCheckedChange={setLiveUpdates}
                   />
-                  <Label htmlFor="auto-refresh" className="text-sm font-medium text-gray-700 flex items-center">
+                  <Label htmlFor="live-updates" className="text-sm font-medium text-gray-700 flex items-center">
                     <RefreshCcw className="w-4 h-4 mr-1" />
-                    Auto-refresh
+                    Live updates
                   </Label>
                 </div>
               </CardHeader>
               <CardContent>
                 <StatusCard
                   status={status}
+                  progress={progress}
                   onRefresh={fetchStatus}
                   onTriggerSync={triggerSync}
-                  autoRefresh={autoRefresh}
+                  onSyncEvent={handleSyncEvent}
+                  eventsUrl={`${API_BASE_URL}/events`}
+                  liveUpdates={liveUpdates}
                 />
               </CardContent>
             </Card>
           </motion.div>
 
+          <motion.div
+            initial={{ opacity: 0, y: 20 }}
+            animate={{ opacity: 1, y: 0 }}
+            transition={{ delay: 0.3, duration: 0.5 }}
+          >
+            <PlanCard planUrl={`${API_BASE_URL}/plan`} />
+          </motion.div>
+
+          <motion.div
+            initial={{ opacity: 0, y: 20 }}
+            animate={{ opacity: 1, y: 0 }}
+            transition={{ delay: 0.35, duration: 0.5 }}
+          >
+            <HistoryCard historyUrl={`${API_BASE_URL}/history`} refreshKey={status ? `${status.last_run}-${status.status}` : null} />
+          </motion.div>
+
           <motion.div
             initial={{ opacity: 0, y: 20 }}
             animate={{ opacity: 1, y: 0 }}
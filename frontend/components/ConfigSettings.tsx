@@ -64,11 +64,21 @@ export const ConfigSettings: React.FC<ConfigSettingsProps> = ({ config, onUpdate
               <SelectValue placeholder="Select schedule" />
             </SelectTrigger>
             <SelectContent>
+              <SelectItem value="single">Manual only</SelectItem>
+              <SelectItem value="hourly">Hourly</SelectItem>
               <SelectItem value="daily">Daily</SelectItem>
               <SelectItem value="weekly">Weekly</SelectItem>
               <SelectItem value="monthly">Monthly</SelectItem>
             </SelectContent>
           </Select>
+          <Input
+            id="run-schedule-cron"
+            key={config?.RUN_SCHEDULE}
+            defaultValue={config?.RUN_SCHEDULE}
+            placeholder="Cron expression, e.g. 0 4 * * 1-5"
+            onBlur={(e) => e.target.value !== config?.RUN_SCHEDULE && onUpdate('RUN_SCHEDULE', e.target.value)}
+            className="transition-all duration-200 focus:ring-2 focus:ring-primary"
+          />
         </div>
         <div className="space-y-2">
           <Label htmlFor="notification-email">Notification Email</Label>
@@ -0,0 +1,118 @@
+import React from 'react';
+import { Button } from "@/components/ui/button";
+import { Card, CardContent, CardDescription, CardFooter, CardHeader, CardTitle } from "@/components/ui/card";
+import { Badge } from "@/components/ui/badge";
+import { ChevronLeft, ChevronRight } from "lucide-react";
+
+type Percentiles = { p50: number | null; p95: number | null };
+
+type SyncRun = {
+  id: string;
+  trigger: string | null;
+  status: string;
+  started_at: string;
+  duration_seconds: number;
+  created: number;
+  updated: number;
+  unchanged: number;
+  failed: number;
+  throughput: number | null;
+  error: string | null;
+};
+
+export type SyncHistory = {
+  runs: SyncRun[];
+  page: number;
+  pages: number;
+  total: number;
+  aggregate: {
+    days: number;
+    runs: number;
+    statuses: Record<string, number>;
+    duration_seconds: Percentiles;
+    throughput: Percentiles;
+    trend: { day: string; runs: number; failed_runs: number; avg_duration_seconds: number }[];
+  };
+};
+
+type HistoryCardProps = {
+  historyUrl: string;
+  // Changes whenever a run finishes, so the history is reloaded
+  refreshKey?: string | null;
+};
+
+const PAGE_SIZE = 5;
+
+const formatSeconds = (value: number | null) => value == null ? '—' : `${value.toFixed(1)}s`;
+
+const statusVariant = (status: string) => status === 'failed' ? 'destructive' : status === 'completed' ? 'default' : 'secondary';
+
+export const HistoryCard: React.FC<HistoryCardProps> = ({ historyUrl, refreshKey }) => {
+  const [history, setHistory] = React.useState<SyncHistory | null>(null);
+  const [page, setPage] = React.useState(1);
+  const [error, setError] = React.useState<string | null>(null);
+
+  React.useEffect(() => {
+    const loadHistory = async () => {
+      try {
+        const response = await fetch(`${historyUrl}?page=${page}&per_page=${PAGE_SIZE}`);
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.message || 'Network response was not ok');
+        setHistory(data);
+        setError(null);
+      } catch (err) {
+        console.error('Error fetching sync history:', err);
+        setError(err instanceof Error ? err.message : 'Failed to fetch sync history');
+      }
+    };
+    loadHistory();
+  }, [historyUrl, page, refreshKey]);
+
+  const aggregate = history?.aggregate;
+
+  return (
+    <Card className="shadow-lg overflow-hidden">
+      <CardHeader>
+        <CardTitle className="text-2xl">Sync History</CardTitle>
+        <CardDescription>
+          {error ? error : aggregate
+            ? `${aggregate.runs} runs in the last ${aggregate.days} days`
+            : 'Loading history…'}
+        </CardDescription>
+        {aggregate && (
+          <div className="flex flex-wrap gap-2 pt-2">
+            <Badge variant="secondary">p50 {formatSeconds(aggregate.duration_seconds.p50)}</Badge>
+            <Badge variant="secondary">p95 {formatSeconds(aggregate.duration_seconds.p95)}</Badge>
+            <Badge variant={aggregate.statuses.failed ? "destructive" : "secondary"}>{aggregate.statuses.failed ?? 0} failed</Badge>
+          </div>
+        )}
+      </CardHeader>
+      {history && history.runs.length > 0 && (
+        <CardContent className="text-sm">
+          <ul className="space-y-2">
+            {history.runs.map((run) => (
+              <li key={run.id} className="flex items-center justify-between gap-2">
+                <span className="text-gray-700">
+                  {new Date(run.started_at).toLocaleString()} · {formatSeconds(run.duration_seconds)} ·{' '}
+                  {run.created} created, {run.updated} updated, {run.failed} failed
+                </span>
+                <Badge variant={statusVariant(run.status)} title={run.error ?? undefined}>{run.status}</Badge>
+              </li>
+            ))}
+          </ul>
+        </CardContent>
+      )}
+      {history && history.pages > 1 && (
+        <CardFooter className="bg-gray-50 justify-between">
+          <Button variant="outline" size="sm" onClick={() => setPage(page - 1)} disabled={page <= 1}>
+            <ChevronLeft className="h-4 w-4" />
+          </Button>
+          <span className="text-sm text-gray-600">Page {history.page} of {history.pages}</span>
+          <Button variant="outline" size="sm" onClick={() => setPage(page + 1)} disabled={page >= history.pages}>
+            <ChevronRight className="h-4 w-4" />
+          </Button>
+        </CardFooter>
+      )}
+    </Card>
+  );
+};
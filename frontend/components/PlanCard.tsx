@@ -0,0 +1,158 @@
+import React from 'react';
+import { Button } from "@/components/ui/button";
+import { Card, CardContent, CardDescription, CardFooter, CardHeader, CardTitle } from "@/components/ui/card";
+import { Badge } from "@/components/ui/badge";
+import { RefreshCw, Loader2 } from "lucide-react";
+
+type FieldChange = { current: unknown; planned: unknown };
+
+type DanglingItem = { name: string; href: string; first_seen: string; count: number; runs_until_deletion: number };
+
+export type SyncPlan = {
+  generated_at: string;
+  refreshed: boolean;
+  summary: {
+    create: number;
+    update: number;
+    unchanged: number;
+    invalid: number;
+    dangling_pending: number;
+    dangling_due: number;
+  };
+  creates: { name: string; parent: boolean }[];
+  updates: { name: string; parent: boolean; href: string; changes: Record<string, FieldChange> }[];
+  invalid: { name: string; parent: boolean; error: string }[];
+  dangling: { pending: DanglingItem[]; due: DanglingItem[] };
+};
+
+// With TENANTS configured the API returns one plan per tenant and a combined summary
+type TenantPlans = Pick<SyncPlan, 'generated_at' | 'refreshed' | 'summary'> & {
+  tenants: Record<string, SyncPlan | { error: string }>;
+};
+
+const prefixed = <T extends { name: string }>(tenant: string, items: T[]) =>
+  items.map((item) => ({ ...item, name: `${tenant}: ${item.name}` }));
+
+const combineTenantPlans = (data: TenantPlans): SyncPlan => {
+  const plan: SyncPlan = {
+    generated_at: data.generated_at,
+    refreshed: data.refreshed,
+    summary: data.summary,
+    creates: [],
+    updates: [],
+    invalid: [],
+    dangling: { pending: [], due: [] },
+  };
+  Object.entries(data.tenants).forEach(([tenant, tenantPlan]) => {
+    if ('error' in tenantPlan) {
+      plan.invalid.push({ name: tenant, parent: false, error: tenantPlan.error });
+      return;
+    }
+    plan.creates.push(...prefixed(tenant, tenantPlan.creates));
+    plan.updates.push(...prefixed(tenant, tenantPlan.updates));
+    plan.invalid.push(...prefixed(tenant, tenantPlan.invalid));
+    plan.dangling.pending.push(...prefixed(tenant, tenantPlan.dangling.pending));
+    plan.dangling.due.push(...prefixed(tenant, tenantPlan.dangling.due));
+  });
+  return plan;
+};
+
+type PlanCardProps = {
+  planUrl: string;
+};
+
+// Long plans are cut off in the dashboard, the full list is available from the API
+const MAX_ITEMS = 10;
+
+const formatValue = (value: unknown) => Array.isArray(value) ? value.join(', ') : String(value ?? '—');
+
+export const PlanCard: React.FC<PlanCardProps> = ({ planUrl }) => {
+  const [plan, setPlan] = React.useState<SyncPlan | null>(null);
+  const [loading, setLoading] = React.useState(false);
+  const [error, setError] = React.useState<string | null>(null);
+
+  const loadPlan = React.useCallback(async (refresh: boolean) => {
+    setLoading(true);
+    try {
+      const response = await fetch(refresh ? `${planUrl}?refresh=1` : planUrl);
+      const data = await response.json();
+      if (!response.ok) throw new Error(data.message || 'Network response was not ok');
+      setPlan('tenants' in data ? combineTenantPlans(data) : data);
+      setError(null);
+    } catch (err) {
+      console.error('Error fetching sync plan:', err);
+      setError(err instanceof Error ? err.message : 'Failed to fetch sync plan');
+    } finally {
+      setLoading(false);
+    }
+  }, [planUrl]);
+
+  React.useEffect(() => {
+    loadPlan(false);
+  }, [loadPlan]);
+
+  return (
+    <Card className="shadow-lg overflow-hidden">
+      <CardHeader>
+        <CardTitle className="text-2xl">Planned Changes</CardTitle>
+        <CardDescription>
+          {error ? error : plan
+            ? `Computed ${new Date(plan.generated_at).toLocaleString()} from ${plan.refreshed ? 'fresh' : 'cached'} data`
+            : 'Computing plan…'}
+        </CardDescription>
+        {plan && (
+          <div className="flex flex-wrap gap-2 pt-2">
+            <Badge variant="default">{plan.summary.create} to create</Badge>
+            <Badge variant="default">{plan.summary.update} to update</Badge>
+            <Badge variant="secondary">{plan.summary.unchanged} unchanged</Badge>
+            <Badge variant="secondary">{plan.summary.dangling_pending} dangling</Badge>
+            <Badge variant={plan.summary.dangling_due ? "destructive" : "secondary"}>{plan.summary.dangling_due} to delete</Badge>
+            {plan.summary.invalid > 0 && <Badge variant="destructive">{plan.summary.invalid} invalid</Badge>}
+          </div>
+        )}
+      </CardHeader>
+      {plan && (plan.creates.length > 0 || plan.updates.length > 0 || plan.dangling.due.length > 0) && (
+        <CardContent className="space-y-4 text-sm">
+          {plan.creates.length > 0 && (
+            <div>
+              <h4 className="font-semibold mb-1">New contacts</h4>
+              <ul className="list-disc pl-5 text-gray-700">
+                {plan.creates.slice(0, MAX_ITEMS).map((item) => <li key={item.name}>{item.name}</li>)}
+              </ul>
+            </div>
+          )}
+          {plan.updates.length > 0 && (
+            <div>
+              <h4 className="font-semibold mb-1">Updated contacts</h4>
+              <ul className="list-disc pl-5 text-gray-700">
+                {plan.updates.slice(0, MAX_ITEMS).map((item) => (
+                  <li key={item.href}>
+                    {item.name}:{' '}
+                    {Object.entries(item.changes).map(([field, change]) =>
+                      `${field} ${formatValue(change.current)} → ${formatValue(change.planned)}`).join('; ')}
+                  </li>
+                ))}
+              </ul>
+            </div>
+          )}
+          {plan.dangling.due.length > 0 && (
+            <div>
+              <h4 className="font-semibold mb-1">Contacts deleted on next sync</h4>
+              <ul className="list-disc pl-5 text-gray-700">
+                {plan.dangling.due.slice(0, MAX_ITEMS).map((item) => (
+                  <li key={item.href}>{item.name} (missing since {item.first_seen})</li>
+                ))}
+              </ul>
+            </div>
+          )}
+        </CardContent>
+      )}
+      <CardFooter className="bg-gray-50">
+        <Button variant="outline" onClick={() => loadPlan(true)} disabled={loading} className="hover:bg-gray-200 transition-colors duration-200">
+          {loading ? <Loader2 className="mr-2 h-4 w-4 animate-spin" /> : <RefreshCw className="mr-2 h-4 w-4" />}
+          Recompute with fresh data
+        </Button>
+      </CardFooter>
+    </Card>
+  );
+};
@@ -5,29 +5,71 @@ import { Badge } from "@/components/ui/badge";
 import { AlertCircle, CheckCircle2, RefreshCw, Loader2, Server } from "lucide-react";
 import { motion } from 'framer-motion';
 
+export type SyncProgress = {
+  phase?: string;
+  processed?: number;
+  total?: number;
+  created?: number;
+  updated?: number;
+  unchanged?: number;
+  failed?: number;
+  eta_seconds?: number | null;
+};
+
+export type SyncEvent = {
+  status: { details: string; last_run: string; status: string };
+  jobs: { running: { id: string; progress: SyncProgress } | null };
+};
+
 type StatusCardProps = {
   status: { details: string; last_run: string; status: string } | null;
+  progress: SyncProgress | null;
   onRefresh: () => void;
   onTriggerSync: () => void;
-  autoRefresh: boolean;
+  onSyncEvent: (event: SyncEvent) => void;
+  eventsUrl: string;
+  liveUpdates: boolean;
+};
+
+// Delay before reopening the event stream after the backend turned it away
+const EVENT_RETRY_MS = 15000;
+
+const formatPhase = (phase?: string) => phase ? phase.replace(/_/g, ' ') : 'starting';
+
+const formatEta = (seconds?: number | null) => {
+  if (seconds === null || seconds === undefined) return null;
+  if (seconds < 60) return `${Math.round(seconds)}s left`;
+  return `${Math.floor(seconds / 60)}m ${Math.round(seconds % 60)}s left`;
 };
 
-export const StatusCard: React.FC<StatusCardProps> = ({ status, onRefresh, onTriggerSync, autoRefresh }) => {
+export const StatusCard: React.FC<StatusCardProps> = ({ status, progress, onRefresh, onTriggerSync, onSyncEvent, eventsUrl, liveUpdates }) => {
   React.useEffect(() => {
-    let intervalId: NodeJS.Timeout;
+    if (!liveUpdates) return;
 
-    if (autoRefresh) {
-      intervalId = setInterval(() => {
-        onRefresh();
-      }, 5000);
-    }
+    // The backend pushes progress as Server-Sent Events, so no polling is needed
+    let source: EventSource;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+    const connect = () => {
+      source = new EventSource(eventsUrl);
+      source.addEventListener('progress', (event) => {
+        onSyncEvent(JSON.parse((event as MessageEvent).data));
+      });
+      // Streams that end are reopened by the browser, but a rejected one (503) is closed for good
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          reconnectTimer = setTimeout(connect, EVENT_RETRY_MS);
+        }
+      };
+    };
+    connect();
 
     return () => {
-      if (intervalId) {
-        clearInterval(intervalId);
-      }
+      clearTimeout(reconnectTimer);
+      source.close();
     };
-  }, [autoRefresh, onRefresh]);
+  }, [liveUpdates, eventsUrl, onSyncEvent]);
+
+  const percent = progress?.total ? Math.min(100, Math.round(((progress.processed ?? 0) / progress.total) * 100)) : 0;
   
   return (
     <Card className="shadow-lg overflow-hidden">
@@ -57,6 +99,26 @@ export const StatusCard: React.FC<StatusCardProps> = ({ status, onRefresh, onTri
           </motion.div>
         </div>
         <CardDescription>{status?.details || "Status unknown"}</CardDescription>
+        {progress && (
+          <div className="mt-4 space-y-2">
+            <div className="flex justify-between text-sm text-gray-600">
+              <span className="capitalize">{formatPhase(progress.phase)}</span>
+              <span>
+                {progress.total ? `${progress.processed ?? 0} / ${progress.total} members` : null}
+                {formatEta(progress.eta_seconds) ? ` · ${formatEta(progress.eta_seconds)}` : null}
+              </span>
+            </div>
+            <div className="h-2 w-full rounded-full bg-gray-200 overflow-hidden">
+              <div className="h-full bg-primary transition-all duration-300" style={{ width: `${percent}%` }} />
+            </div>
+            <div className="flex space-x-4 text-xs text-gray-500">
+              <span>{progress.created ?? 0} created</span>
+              <span>{progress.updated ?? 0} updated</span>
+              <span>{progress.unchanged ?? 0} unchanged</span>
+              <span>{progress.failed ?? 0} failed</span>
+            </div>
+          </div>
+        )}
       </CardHeader>
       <CardFooter className="bg-gray-50">
         <div className="flex justify-between w-full">